@@ -8,6 +8,8 @@ import os
 import sys
 import time
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
 from anthropic import Anthropic, APIError, RateLimitError, APIConnectionError
@@ -22,6 +24,8 @@ from bulk_config import (
     MAX_TOKENS,
     MAX_RETRIES,
     RETRY_BASE_DELAY,
+    API_CONCURRENCY,
+    MIN_SUB_BATCH_SIZE,
 )
 from prompts import SYSTEM_PROMPT, build_categorization_prompt, EXAMPLES
 
@@ -42,6 +46,8 @@ class ClaudeCategorizer:
         self.model = CLAUDE_MODEL
         self.total_input_tokens = 0
         self.total_output_tokens = 0
+        self.failed_sub_batches = 0  # sub-batches dropped after their retry
+        self._usage_lock = threading.Lock()  # sub-batches run in threads
 
     def categorize_batch(
         self,
@@ -59,7 +65,59 @@ class ClaudeCategorizer:
 
         Returns:
             List of categorization dicts: [{row, category, confidence}, ...]
+
+        A sub-batch that fails is retried once on its own; if it fails again
+        its rows are left out and counted in failed_sub_batches.
         """
+        # Split into sub-batches and call the API for them concurrently, so
+        # a batch takes about as long as its slowest part instead of the sum
+        n_chunks = max(1, min(API_CONCURRENCY, len(transactions) // MIN_SUB_BATCH_SIZE))
+        if n_chunks == 1:
+            return self._categorize_chunk(transactions, categories, include_examples)
+
+        size = -(-len(transactions) // n_chunks)  # ceil division
+        chunks = [transactions[i:i + size] for i in range(0, len(transactions), size)]
+
+        categorizations = []
+        failed_chunks = []
+        with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+            futures = [
+                pool.submit(self._categorize_chunk, chunk, categories, include_examples)
+                for chunk in chunks
+            ]
+            for chunk, future in zip(chunks, futures):
+                try:
+                    categorizations.extend(future.result())
+                except Exception as e:
+                    logger.warning(f"Sub-batch of {len(chunk)} failed, retrying: {e}")
+                    failed_chunks.append(chunk)
+
+        # Retry failed sub-batches one at a time, off the concurrent burst
+        errors = []
+        for chunk in failed_chunks:
+            try:
+                categorizations.extend(
+                    self._categorize_chunk(chunk, categories, include_examples)
+                )
+            except Exception as e:
+                errors.append(e)
+
+        if errors:
+            if len(errors) == len(chunks):
+                raise errors[0]
+            # Rows from failed sub-batches stay uncategorized for a later run
+            logger.error(f"{len(errors)}/{len(chunks)} sub-batches failed after retry: {errors[0]}")
+            self.failed_sub_batches += len(errors)
+
+        return categorizations
+
+    def _categorize_chunk(
+        self,
+        transactions: List[Dict[str, Any]],
+        categories: List[Dict[str, Any]],
+        include_examples: bool
+    ) -> List[Dict[str, Any]]:
+        """Categorize one sub-batch with a single API call."""
         # Build prompt
         prompt = build_categorization_prompt(transactions, categories)
         if include_examples:
@@ -87,8 +145,9 @@ class ClaudeCategorizer:
                 )
 
                 # Track token usage
-                self.total_input_tokens += response.usage.input_tokens
-                self.total_output_tokens += response.usage.output_tokens
+                with self._usage_lock:
+                    self.total_input_tokens += response.usage.input_tokens
+                    self.total_output_tokens += response.usage.output_tokens
 
                 # Extract text content
                 content = response.content[0].text
@@ -16,15 +16,20 @@ import json
 import logging
 import os
 import sys
+import threading
 import time
+from collections import Counter
 from datetime import datetime
+from itertools import islice
 from typing import Dict, Any, List, Optional
 
-# Add parent directories to path
+# Add parent directories to path (once; the MCP server imports this module
+# with most of them already present)
 script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(script_dir)
-sys.path.insert(0, project_root)
-sys.path.insert(0, os.path.join(project_root, 'mcp_categorizer'))
+for path in (project_root, os.path.join(project_root, 'mcp_categorizer'), script_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
 from bulk_config import (
     BATCH_SIZE,
@@ -38,20 +43,18 @@ from bulk_config import (
 from api_client import ClaudeCategorizer
 
 # Import from mcp_categorizer
-from categorizer import TransactionCategorizer
+from categorizer import TransactionCategorizer, MerchantPatternIndex, top_category_by_pattern
 from sheets_client import SheetsClient
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(script_dir, 'bulk_categorize.log'))
-    ]
-)
 logger = logging.getLogger(__name__)
 
+STATS_FILE = os.path.join(script_dir, 'last_run_stats.json')
+LOG_FILE = os.path.join(script_dir, 'bulk_categorize.log')
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Loggers whose records run() copies to LOG_FILE
+RUN_LOGGERS = (__name__, 'api_client')
+
 
 class BulkCategorizer:
     """Orchestrates bulk categorization of transactions."""
@@ -62,18 +65,24 @@ class BulkCategorizer:
         max_batches: int = MAX_BATCHES,
         dry_run: bool = False,
         learn_rules: bool = True,
-        filter_parent: Optional[str] = None
+        filter_parent: Optional[str] = None,
+        api_key: Optional[str] = None,
+        categorizer: Optional[TransactionCategorizer] = None,
+        stop_event: Optional[threading.Event] = None
     ):
         self.batch_size = batch_size
         self.max_batches = max_batches
         self.dry_run = dry_run
         self.learn_rules = learn_rules
         self.filter_parent = filter_parent
+        # Set by the caller to stop the run before its next batch
+        self.stop_event = stop_event or threading.Event()
 
         # Initialize clients
-        self.sheets = SheetsClient()
-        self.claude = ClaudeCategorizer()
-        self.categorizer = None  # Lazy loaded
+        # Runs off the event loop, so it may sleep to pace its writes
+        self.sheets = SheetsClient(pace_writes=True)
+        self.claude = ClaudeCategorizer(api_key=api_key)
+        self.categorizer = categorizer  # Lazy loaded unless provided
 
         # Statistics
         self.stats = {
@@ -87,7 +96,7 @@ class BulkCategorizer:
         }
 
         # Track merchant patterns for rule learning
-        self.merchant_patterns: Dict[str, Dict[str, int]] = {}
+        self.merchant_patterns: Counter = Counter()  # (pattern, category_id) -> count
 
     def _load_categorizer(self) -> TransactionCategorizer:
         """Load the categorizer with current rules."""
@@ -106,14 +115,14 @@ class BulkCategorizer:
         """Get category list for prompts."""
         return self.sheets.get_categories()
 
-    def _save_progress(self, processed_rows: List[int], seen_rows: List[int] = None, offset: int = 0):
+    def _save_progress(self, processed_rows: List[int], seen_rows: List[int] = None, after_row: int = 0):
         """Save progress for resume capability."""
         progress = {
             'timestamp': datetime.now().isoformat(),
             'stats': self.stats,
             'processed_rows': processed_rows,
             'seen_rows': seen_rows or processed_rows,
-            'offset': offset,
+            'after_row': after_row,
         }
         with open(PROGRESS_FILE, 'w') as f:
             json.dump(progress, f, indent=2)
@@ -130,7 +139,7 @@ class BulkCategorizer:
             return {
                 'processed_rows': progress.get('processed_rows', []),
                 'seen_rows': progress.get('seen_rows', progress.get('processed_rows', [])),
-                'offset': progress.get('offset', 0),
+                'after_row': progress.get('after_row', 0),
             }
         except Exception as e:
             logger.warning(f"Failed to load progress: {e}")
@@ -162,19 +171,19 @@ class BulkCategorizer:
             if not desc:
                 continue
 
-            # Extract pattern (first 2-3 words)
-            words = desc.split()[:3]
+            # Extract pattern (first 2-3 words; maxsplit stops after those)
+            words = desc.split(None, 3)[:3]
             pattern = ' '.join(words)
 
             if len(pattern) < MIN_PATTERN_LENGTH:
                 continue
 
-            # Track pattern -> category counts
-            if pattern not in self.merchant_patterns:
-                self.merchant_patterns[pattern] = {}
+            # Patterns an existing rule already covers can't become rules
+            if self.categorizer.merchant_pattern_index().covers(pattern):
+                continue
 
-            self.merchant_patterns[pattern][category_id] = \
-                self.merchant_patterns[pattern].get(category_id, 0) + 1
+            # Track (pattern, category) counts
+            self.merchant_patterns[(pattern, category_id)] += 1
 
     def _commit_learned_rules(self):
         """
@@ -185,36 +194,40 @@ class BulkCategorizer:
             return
 
         # Get existing rules once (using cache)
-        existing_rules = {r['merchant_pattern'] for r in self.sheets.get_merchant_rules(use_cache=True)}
+        existing_rules = MerchantPatternIndex(
+            r['merchant_pattern'] for r in self.sheets.get_merchant_rules(use_cache=True)
+        )
 
         rules_to_add = []
-        for pattern, cat_counts in self.merchant_patterns.items():
-            top_category = max(cat_counts, key=cat_counts.get)
-            count = cat_counts[top_category]
-
+        for pattern, (top_category, count) in top_category_by_pattern(self.merchant_patterns).items():
             if count >= RULE_LEARNING_THRESHOLD and pattern not in existing_rules:
                 # Check if covered by existing rule
-                is_covered = any(pattern in r or r in pattern for r in existing_rules)
-                if is_covered:
+                if existing_rules.covers(pattern):
                     continue
 
                 rules_to_add.append((pattern, top_category, count))
                 existing_rules.add(pattern)  # Prevent duplicates in this batch
 
-        # Add rules in batch
+        # Add rules in batch (one append for all of them)
         logger.info(f"Adding {len(rules_to_add)} learned merchant rules...")
-        for pattern, top_category, count in rules_to_add:
-            result = self.sheets.add_merchant_rule(
-                merchant_pattern=pattern,
-                category_id=top_category,
-                confidence=90,
-                notes=f"Auto-learned from {count} bulk categorizations",
-                skip_duplicate_check=True  # We already checked above
-            )
+        if not rules_to_add:
+            return
+        result = self.sheets.add_merchant_rules(
+            [
+                {
+                    'merchant_pattern': pattern,
+                    'category_id': top_category,
+                    'confidence': 90,
+                    'notes': f"Auto-learned from {count} bulk categorizations",
+                }
+                for pattern, top_category, count in rules_to_add
+            ],
+            skip_duplicate_check=True  # We already checked above
+        )
 
-            if result.get('success'):
-                logger.info(f"Learned rule: '{pattern}' -> {top_category}")
-                self.stats['rules_learned'] += 1
+        for rule in result.get('added', []):
+            logger.info(f"Learned rule: '{rule['merchant_pattern']}' -> {rule['category_id']}")
+            self.stats['rules_learned'] += 1
 
     def run(self, resume: bool = False) -> Dict[str, Any]:
         """
@@ -243,8 +256,9 @@ class BulkCategorizer:
                     allowed_category_ids.add(cat['category_id'])
             logger.info(f"Allowed categories: {allowed_category_ids}")
 
-        # Load categorizer
-        self._load_categorizer()
+        # Load categorizer (unless the caller passed a warm one)
+        if self.categorizer is None:
+            self._load_categorizer()
         categories = self._get_categories()
         logger.info(f"Loaded {len(self.categorizer.merchant_rules)} merchant rules")
         logger.info(f"Loaded {len(categories)} categories")
@@ -252,44 +266,48 @@ class BulkCategorizer:
         # Load progress if resuming
         processed_rows = set()  # Rows we've actually categorized
         seen_rows = set()       # Rows we've seen (for pagination with filters)
-        current_offset = 0
+        after_row = 0           # Keyset cursor: last sheet row fetched
         if resume:
             prev_progress = self._load_progress()
             if prev_progress:
                 processed_rows = set(prev_progress.get('processed_rows', []))
                 seen_rows = set(prev_progress.get('seen_rows', []))
-                current_offset = prev_progress.get('offset', 0)
-                logger.info(f"Resuming with {len(processed_rows)} processed, {len(seen_rows)} seen, offset {current_offset}")
+                after_row = prev_progress.get('after_row', 0)
+                logger.info(f"Resuming with {len(processed_rows)} processed, {len(seen_rows)} seen, after row {after_row}")
 
         consecutive_errors = 0
         batch_num = 0
 
-        # Determine if we need offset-based pagination
-        # Only needed when filtering (filtered-out rows stay uncategorized)
-        use_offset_pagination = bool(allowed_category_ids)
+        # Stream uncategorized transactions forward from the cursor, so each
+        # sheet page is read once per run rather than re-reading the sheet
+        # from the top for every batch. Rows left uncategorized (filtered
+        # out, or not returned by Claude) are behind the cursor and are not
+        # revisited in this run.
+        def open_stream():
+            return self.sheets.iter_uncategorized_transactions(after_row=after_row)
+
+        txn_stream = open_stream()
 
         while batch_num < self.max_batches:
+            if self.stop_event.is_set():
+                logger.warning(f"Stop requested, ending run after {batch_num} batches")
+                self.stats['stopped_early'] = True
+                break
+
             batch_num += 1
             logger.info(f"\n--- Batch {batch_num}/{self.max_batches} ---")
 
-            # Get uncategorized transactions
-            # When not filtering: always offset=0 (categorized rows disappear from results)
-            # When filtering: use offset to advance past rows we've seen but skipped
-            fetch_offset = current_offset if use_offset_pagination else 0
-
+            # Get the next batch of uncategorized transactions
+            fetch_after = after_row
             try:
-                transactions = self.sheets.get_uncategorized_transactions(
-                    limit=self.batch_size,
-                    offset=fetch_offset
-                )
+                transactions = list(islice(txn_stream, self.batch_size))
             except Exception as e:
                 if '429' in str(e) or 'Quota exceeded' in str(e):
                     logger.warning("Google Sheets rate limit hit, waiting 60 seconds...")
                     time.sleep(60)
-                    transactions = self.sheets.get_uncategorized_transactions(
-                        limit=self.batch_size,
-                        offset=fetch_offset
-                    )
+                    # A generator that raised is finished; reopen at the cursor
+                    txn_stream = open_stream()
+                    transactions = list(islice(txn_stream, self.batch_size))
                 else:
                     raise
 
@@ -303,30 +321,30 @@ class BulkCategorizer:
                 for t in transactions
             ]
 
-            # Filter out already seen rows (for resume or when using offset pagination)
-            if seen_rows and use_offset_pagination:
+            # Advance the cursor past this batch
+            after_row = max(filter(None, batch_row_numbers), default=after_row)
+
+            # Filter out rows already seen by a previous run (resume)
+            if seen_rows:
                 transactions = [
                     t for t in transactions
                     if (t.get('row_number') or t.get('_row_number')) not in seen_rows
                 ]
 
             if not transactions:
-                # All transactions in this batch were already seen, advance offset
-                current_offset += self.batch_size
-                logger.info(f"All fetched transactions already seen, advancing to offset {current_offset}")
+                # All transactions in this batch were already seen
+                logger.info(f"All fetched transactions already seen, advancing past row {after_row}")
                 continue
 
-            logger.info(f"Processing {len(transactions)} transactions (fetch_offset: {fetch_offset})")
+            logger.info(f"Processing {len(transactions)} transactions (after row: {fetch_after})")
 
-            # Mark these rows as seen (for filtering mode)
-            if use_offset_pagination:
+            # Mark these rows as seen (for filtering mode, where they stay
+            # uncategorized and would be fetched again by a resumed run)
+            if allowed_category_ids:
                 for row_num in batch_row_numbers:
                     if row_num:
                         seen_rows.add(row_num)
 
-                # Advance offset for next batch (only in filtering mode)
-                current_offset += self.batch_size
-
             # Step 1: Apply deterministic rules first
             results = self.categorizer.categorize_batch(transactions)
 
@@ -338,7 +356,7 @@ class BulkCategorizer:
                 # Filter rule-matched to only allowed categories
                 auto_categorized = [
                     t for t in auto_categorized
-                    if t['_categorization']['category_id'] in allowed_category_ids
+                    if t['_categorization'].category_id in allowed_category_ids
                 ]
                 # For needs_claude, use keyword heuristics to filter likely matches
                 food_keywords = [
@@ -366,11 +384,11 @@ class BulkCategorizer:
                     cat_info = t['_categorization']
                     updates.append({
                         'row_number': t.get('_row_number'),
-                        'category_id': cat_info['category_id'],
-                        'source': cat_info['source'],
-                        'confidence': cat_info['confidence'],
-                        'needs_review': cat_info.get('needs_review', False),
-                        'review_reason': cat_info.get('review_reason', '')
+                        'category_id': cat_info.category_id,
+                        'source': cat_info.source,
+                        'confidence': cat_info.confidence,
+                        'needs_review': cat_info.needs_review,
+                        'review_reason': cat_info.review_reason or ''
                     })
                 self.sheets.write_categories(updates)
                 self.stats['rule_categorized'] += len(updates)
@@ -382,6 +400,7 @@ class BulkCategorizer:
             # Step 2: Send remaining to Claude API
             if needs_claude:
                 try:
+                    failed_before = self.claude.failed_sub_batches
                     categorizations = self.claude.categorize_batch(
                         transactions=needs_claude,
                         categories=categories
@@ -401,7 +420,16 @@ class BulkCategorizer:
                     for c in categorizations:
                         processed_rows.add(c.get('row_number'))
 
-                    consecutive_errors = 0
+                    # Sub-batches that failed after their retry are errors too
+                    failed = self.claude.failed_sub_batches - failed_before
+                    if failed:
+                        self.stats['errors'] += failed
+                        consecutive_errors += 1
+                        if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                            logger.error(f"Too many consecutive errors ({consecutive_errors}), stopping")
+                            break
+                    else:
+                        consecutive_errors = 0
 
                 except Exception as e:
                     logger.error(f"Error calling Claude API: {e}")
@@ -416,11 +444,11 @@ class BulkCategorizer:
             self.stats['batches_completed'] = batch_num
 
             # Save progress
-            self._save_progress(list(processed_rows), list(seen_rows), current_offset)
+            self._save_progress(list(processed_rows), list(seen_rows), after_row)
 
-            # Delay between batches
+            # Delay between batches (cut short by a stop request)
             if batch_num < self.max_batches:
-                time.sleep(BATCH_DELAY)
+                self.stop_event.wait(BATCH_DELAY)
 
         # Commit learned rules in batch (reduces API calls)
         self._commit_learned_rules()
@@ -442,6 +470,60 @@ class BulkCategorizer:
         return self.stats
 
 
+def run(
+    batch_size: int = BATCH_SIZE,
+    max_batches: int = MAX_BATCHES,
+    dry_run: bool = False,
+    learn_rules: bool = True,
+    filter_parent: Optional[str] = None,
+    resume: bool = False,
+    api_key: Optional[str] = None,
+    categorizer: Optional[TransactionCategorizer] = None,
+    stop_event: Optional[threading.Event] = None
+) -> Dict[str, Any]:
+    """
+    Run bulk categorization and save the stats to STATS_FILE.
+
+    In-process entry point for the MCP server; main() wraps it for the CLI.
+    The run's log is appended to LOG_FILE whoever configured logging.
+    Setting stop_event ends the run before its next batch.
+
+    Returns:
+        Statistics dict
+    """
+    file_handler = logging.FileHandler(LOG_FILE)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    run_loggers = [logging.getLogger(name) for name in RUN_LOGGERS]
+    for run_logger in run_loggers:
+        run_logger.setLevel(logging.INFO)
+        run_logger.addHandler(file_handler)
+
+    try:
+        bulk = BulkCategorizer(
+            batch_size=batch_size,
+            max_batches=max_batches,
+            dry_run=dry_run,
+            learn_rules=learn_rules,
+            filter_parent=filter_parent,
+            api_key=api_key,
+            categorizer=categorizer,
+            stop_event=stop_event
+        )
+        stats = bulk.run(resume=resume)
+    except Exception:
+        logger.exception("Bulk categorization failed")
+        raise
+    finally:
+        for run_logger in run_loggers:
+            run_logger.removeHandler(file_handler)
+        file_handler.close()
+
+    with open(STATS_FILE, 'w') as f:
+        json.dump(stats, f, indent=2)
+
+    return stats
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Bulk categorize transactions using Claude API'
@@ -481,6 +563,9 @@ def main():
 
     args = parser.parse_args()
 
+    # Console output for the CLI; run() adds the log file itself
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
     # Check for API key - try keychain first, then env var
     api_key = os.environ.get('ANTHROPIC_API_KEY')
     if not api_key:
@@ -506,29 +591,24 @@ def main():
         sys.exit(1)
 
     # Run categorizer
-    categorizer = BulkCategorizer(
-        batch_size=args.batch_size,
-        max_batches=args.max_batches,
-        dry_run=args.dry_run,
-        learn_rules=not args.no_learn_rules,
-        filter_parent=args.filter_parent
-    )
-
     try:
-        stats = categorizer.run(resume=args.resume)
-
-        # Save final stats
-        stats_file = os.path.join(script_dir, 'last_run_stats.json')
-        with open(stats_file, 'w') as f:
-            json.dump(stats, f, indent=2)
+        run(
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+            dry_run=args.dry_run,
+            learn_rules=not args.no_learn_rules,
+            filter_parent=args.filter_parent,
+            resume=args.resume
+        )
 
-        print(f"\nStats saved to: {stats_file}")
+        print(f"\nStats saved to: {STATS_FILE}")
 
     except KeyboardInterrupt:
         print("\nInterrupted by user")
         sys.exit(1)
     except Exception as e:
-        logger.exception(f"Fatal error: {e}")
+        # run() already logged the traceback
+        logger.error(f"Fatal error: {e}")
         sys.exit(1)
 
 
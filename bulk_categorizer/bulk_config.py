@@ -26,6 +26,13 @@ BATCH_SIZE = int(os.environ.get('BATCH_SIZE', '100'))
 # Max batches before stopping (safety limit)
 MAX_BATCHES = int(os.environ.get('MAX_BATCHES', '100'))
 
+# Concurrent Claude API calls per batch. A batch is split into up to this many
+# sub-batches (of at least MIN_SUB_BATCH_SIZE transactions) sent in parallel;
+# each repeats the taxonomy prompt, so N calls cost roughly N times the input
+# tokens. Off (1) by default; raise it to trade tokens for latency
+API_CONCURRENCY = int(os.environ.get('API_CONCURRENCY', '1'))
+MIN_SUB_BATCH_SIZE = 25
+
 # Delay between batches (seconds) to avoid rate limits
 # Google Sheets allows 60 reads/minute, so 2 seconds between batches is safer
 BATCH_DELAY = float(os.environ.get('BATCH_DELAY', '2.0'))
@@ -978,17 +978,23 @@ def process_gmail_notification_http(request):
 
         # Extract message data
         message = data.get('message', {})
-        pubsub_data = message.get('data', '')
 
-        if pubsub_data:
-            decoded = base64.b64decode(pubsub_data).decode()
-            message_data = json.loads(decoded)
+        # Prefer historyId from message attributes when present - avoids the
+        # base64 + JSON decode of the payload
+        attrs = message.get('attributes') or {}
+        history_id = attrs.get('historyId')
 
-            history_id = message_data.get('historyId')
-            if history_id:
-                emails = fetch_emails_by_history(history_id)
-                processed = sum(1 for email in emails if process_single_email(email))
-                return f'Processed {processed} emails', 200
+        if not history_id:
+            pubsub_data = message.get('data', '')
+            if pubsub_data:
+                decoded = base64.b64decode(pubsub_data).decode()
+                message_data = json.loads(decoded)
+                history_id = message_data.get('historyId')
+
+        if history_id:
+            emails = fetch_emails_by_history(history_id)
+            processed = sum(1 for email in emails if process_single_email(email))
+            return f'Processed {processed} emails', 200
 
         return 'OK', 200
 
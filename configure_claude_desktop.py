@@ -8,6 +8,35 @@ import shutil
 from datetime import datetime
 from pathlib import Path
 
+# Claude Desktop config location
+if os.name == 'nt':  # Windows
+    _CONFIG_PATH = Path.home() / "AppData" / "Roaming" / "Claude" / "claude_desktop_config.json"
+else:  # macOS/Linux
+    _CONFIG_PATH = Path.home() / "Library" / "Application Support" / "Claude" / "claude_desktop_config.json"
+
+# orjson is an optional speedup; fall back to stdlib json when absent
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _read_config(path):
+    """Load a JSON config file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _write_config(path, config):
+    """Write a JSON config file with 2-space indentation."""
+    if orjson:
+        data = orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(config, indent=2).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(data)
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -32,23 +61,18 @@ def main():
 
     server_script = str(project_dir / "mcp_categorizer" / "server.py")
 
-    # Claude Desktop config location
-    if os.name == 'nt':  # Windows
-        config_path = Path.home() / "AppData" / "Roaming" / "Claude" / "claude_desktop_config.json"
-    else:  # macOS/Linux
-        config_path = Path.home() / "Library" / "Application Support" / "Claude" / "claude_desktop_config.json"
+    config_path = os.fspath(_CONFIG_PATH)
 
     # Load existing config or create new
-    if config_path.exists():
+    if os.path.exists(config_path):
         backup_name = f".backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        backup_path = config_path.with_suffix(backup_name)
-        shutil.copy2(config_path, backup_path)
+        backup_path = os.fspath(_CONFIG_PATH.with_suffix(backup_name))
+        shutil.copyfile(config_path, backup_path)
         print(f"  Backup: {backup_path}")
 
-        with open(config_path) as f:
-            config = json.load(f)
+        config = _read_config(config_path)
     else:
-        config_path.parent.mkdir(parents=True, exist_ok=True)
+        _CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
         config = {}
 
     # Merge — only touch the budget-categorizer entry, preserve everything else
@@ -69,8 +93,7 @@ def main():
         "env": env,
     }
 
-    with open(config_path, 'w') as f:
-        json.dump(config, f, indent=2)
+    _write_config(config_path, config)
 
     print(f"  Updated: {config_path}")
     print(f"  Python:  {venv_python}")
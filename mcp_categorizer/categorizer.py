@@ -9,8 +9,11 @@ Priority order:
 """
 
 import re
+import bisect
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 
 from config import (
     CONFIDENCE_HIGH,
@@ -23,6 +26,115 @@ from config import (
 
 logger = logging.getLogger(__name__)
 
+# Distinct descriptions whose rule results a categorizer keeps
+DESCRIPTION_CACHE_SIZE = 10_000
+
+# Merchant patterns at least this long are looked up by their leading
+# characters; shorter ones (rare, hand-entered) are scanned directly
+MERCHANT_PREFIX_LEN = 4
+
+
+@dataclass(slots=True)
+class CategorizationResult:
+    """
+    Result of running a transaction through the rule layers.
+
+    category_id is None when the rules couldn't decide and the
+    transaction needs Claude's judgment (needs_claude=True).
+    """
+    category_id: Optional[str] = None
+    category_name: Optional[str] = None
+    source: Optional[str] = None
+    confidence: Optional[int] = None
+    needs_review: bool = False
+    review_reason: Optional[str] = None
+    needs_claude: bool = False
+    matched_pattern: Optional[str] = None
+    matched_keyword: Optional[str] = None
+    merchant_rule_hint: Optional['CategorizationResult'] = None
+
+
+def _result_args(result: CategorizationResult) -> Tuple[Any, ...]:
+    """
+    Positional args that rebuild result via CategorizationResult(*args).
+
+    Much cheaper than copy.copy for handing out fresh copies of a result.
+    """
+    return tuple(getattr(result, name) for name in CategorizationResult.__slots__)
+
+
+def _no_rule_match(description: str) -> None:
+    """Matcher bound in place of apply_*_rules when there are no rules."""
+    return None
+
+
+class MerchantPatternIndex:
+    """
+    Set of merchant rule patterns that answers "is this candidate already
+    covered?", i.e. equal to, containing, or contained in an existing rule.
+
+    Used by rule learning instead of testing the candidate against every
+    rule. Rules inside the candidate are found by looking up its substrings
+    of the rule lengths that occur. The candidate inside a rule is a single
+    C-level search over all rules joined by a NUL separator.
+    """
+
+    _SEP = '\x00'
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._patterns = set()
+        self._lengths: List[int] = []
+        self._haystack = ''
+        for pattern in patterns:
+            self.add(pattern)
+
+    def __contains__(self, pattern: str) -> bool:
+        return pattern in self._patterns
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add(self, pattern: str):
+        """Add a rule pattern to the index."""
+        if pattern in self._patterns:
+            return
+        self._patterns.add(pattern)
+        if len(pattern) not in self._lengths:
+            bisect.insort(self._lengths, len(pattern))
+        self._haystack += self._SEP + pattern
+
+    def covers(self, pattern: str) -> bool:
+        """True if pattern is a substring of, or contains, an indexed rule."""
+        if not self._patterns:
+            return False
+        if pattern in self._haystack:
+            return True
+        patterns = self._patterns
+        for length in self._lengths:
+            if length > len(pattern):
+                break
+            for start in range(len(pattern) - length + 1):
+                if pattern[start:start + length] in patterns:
+                    return True
+        return False
+
+
+def top_category_by_pattern(
+    pair_counts: Dict[Tuple[str, str], int]
+) -> Dict[str, Tuple[str, int]]:
+    """
+    Reduce (pattern, category_id) counts to pattern -> (top category, count).
+
+    Patterns keep first-seen order and ties go to the category counted
+    first, matching max()/most_common() over per-pattern counters.
+    """
+    top: Dict[str, Tuple[str, int]] = {}
+    for (pattern, category), count in pair_counts.items():
+        best = top.get(pattern)
+        if best is None or count > best[1]:
+            top[pattern] = (category, count)
+    return top
+
 
 class TransactionCategorizer:
     """
@@ -47,7 +159,43 @@ class TransactionCategorizer:
             keyword_rules: List of keyword rule dicts
         """
         self.categories = {c['category_id']: c for c in categories}
-        self.category_ids = set(self.categories.keys())
+        self.category_ids = frozenset(self.categories)
+        # Sheet-ordered id list, shared by responses that list valid ids
+        self.category_id_list = list(self.categories)
+        self._cat_name = {cid: c['category_name'] for cid, c in self.categories.items()}
+
+        # Parent indexes, built once per categorizer (reset by reload).
+        # category_ids_by_parent is keyed on the raw sheet value for filters;
+        # categories_by_parent is the taxonomy grouping (blank -> 'Other').
+        self.category_ids_by_parent: Dict[Any, set] = {}
+        self.categories_by_parent: Dict[str, List[Dict]] = {}
+        for cid, cat in self.categories.items():
+            self.category_ids_by_parent.setdefault(cat.get('parent_category'), set()).add(cid)
+            parent = cat.get('parent_category', '') or 'Other'
+            self.categories_by_parent.setdefault(parent, []).append(cat)
+
+        # Validate category references once at ingest instead of per match.
+        # Dropped rules are kept aside so audit_merchant_rules can report them.
+        self.invalid_merchant_rules = [
+            r for r in merchant_rules if r['category_id'] not in self.category_ids
+        ]
+        self.invalid_keyword_rules = [
+            r for r in keyword_rules if r['category_id'] not in self.category_ids
+        ]
+        if self.invalid_merchant_rules:
+            logger.warning(
+                f"Ignoring {len(self.invalid_merchant_rules)} merchant rules with invalid categories: "
+                + ', '.join(f"'{r['merchant_pattern']}' -> '{r['category_id']}'"
+                            for r in self.invalid_merchant_rules)
+            )
+            merchant_rules = [r for r in merchant_rules if r['category_id'] in self.category_ids]
+        if self.invalid_keyword_rules:
+            logger.warning(
+                f"Ignoring {len(self.invalid_keyword_rules)} keyword rules with invalid categories: "
+                + ', '.join(f"'{r['keyword']}' -> '{r['category_id']}'"
+                            for r in self.invalid_keyword_rules)
+            )
+            keyword_rules = [r for r in keyword_rules if r['category_id'] in self.category_ids]
 
         # Sort merchant rules by pattern length (longest first) for deterministic matching
         # This ensures "whole foods market" matches before "whole" or "foods"
@@ -64,12 +212,104 @@ class TransactionCategorizer:
             reverse=True
         )
 
+        # Index merchant rules by their first MERCHANT_PREFIX_LEN characters,
+        # each bucket in rule order, so a description is matched by looking
+        # up each of its positions instead of scanning every pattern
+        self._merchant_prefix_index: Dict[str, List[Tuple[int, str, Tuple[Any, ...]]]] = {}
+        self._short_merchant_matchers: List[Tuple[int, str, Tuple[Any, ...]]] = []
+        for rank, rule in enumerate(self.merchant_rules):
+            pattern = rule['merchant_pattern']
+            # Every field of a rule's result depends only on the rule, so
+            # build it once here; matching builds a fresh one from its args
+            matcher = (rank, pattern, _result_args(self._merchant_result_template(rule)))
+            if len(pattern) >= MERCHANT_PREFIX_LEN:
+                self._merchant_prefix_index.setdefault(pattern[:MERCHANT_PREFIX_LEN], []).append(matcher)
+            else:
+                self._short_merchant_matchers.append(matcher)
+
+        # Precompile word-boundary patterns once, in priority order, so
+        # matching doesn't rebuild (or re-look-up) a regex per rule per call
+        self._keyword_patterns = [
+            (rule['keyword'], re.compile(rf'\b{re.escape(rule["keyword"])}\b'),
+             _result_args(self._keyword_result_template(rule)))
+            for rule in self.keyword_rules
+        ]
+
+        # Specialize for empty rule sets (common on fresh installs): bind a
+        # no-op matcher so each transaction skips the lowercase + loop setup.
+        # Rules are fixed for the lifetime of the instance - create a new
+        # categorizer (see reload_categorizer) to pick up rule changes.
+        if not self.merchant_rules:
+            self.apply_merchant_rules = _no_rule_match
+        if not self.keyword_rules:
+            self.apply_keyword_rules = _no_rule_match
+
+        # Built on first use by merchant_pattern_index()
+        self._merchant_pattern_index = None
+
+        # Per-instance memo of rule results (as constructor args) by
+        # description; rules are fixed for the instance's lifetime, so
+        # entries never go stale
+        self._categorize_description = lru_cache(maxsize=DESCRIPTION_CACHE_SIZE)(
+            lambda description: _result_args(self._categorize_description_uncached(description))
+        )
+
         logger.info(
             f"Initialized categorizer with {len(self.categories)} categories, "
             f"{len(self.merchant_rules)} merchant rules (sorted by specificity), "
             f"{len(self.keyword_rules)} keyword rules (sorted by priority)"
         )
     
+    def merchant_pattern_index(self) -> MerchantPatternIndex:
+        """Index of the active merchant patterns, built once per categorizer."""
+        if self._merchant_pattern_index is None:
+            self._merchant_pattern_index = MerchantPatternIndex(
+                r['merchant_pattern'] for r in self.merchant_rules
+            )
+        return self._merchant_pattern_index
+
+    def with_merchant_rules(
+        self,
+        new_rules: Iterable[Dict[str, Any]]
+    ) -> 'TransactionCategorizer':
+        """
+        Return a categorizer with new_rules appended to the merchant rules.
+
+        Equivalent to reloading after the rules were appended to the sheet,
+        but built from this instance's config without re-reading it.
+        """
+        return TransactionCategorizer(
+            categories=list(self.categories.values()),
+            merchant_rules=self.merchant_rules + self.invalid_merchant_rules + list(new_rules),
+            keyword_rules=self.keyword_rules + self.invalid_keyword_rules
+        )
+
+    def _merchant_result_template(self, rule: Dict[str, Any]) -> CategorizationResult:
+        """Build the result returned whenever this merchant rule matches."""
+        confidence = rule['confidence']
+        return CategorizationResult(
+            category_id=rule['category_id'],
+            category_name=self._cat_name[rule['category_id']],
+            source='merchant_rule',
+            confidence=confidence,
+            matched_pattern=rule['merchant_pattern'],
+            needs_review=confidence < CONFIDENCE_HIGH,
+            review_reason=f"Merchant rule confidence: {confidence}"
+                if confidence < CONFIDENCE_HIGH else None
+        )
+
+    def _keyword_result_template(self, rule: Dict[str, Any]) -> CategorizationResult:
+        """Build the result returned whenever this keyword rule matches."""
+        return CategorizationResult(
+            category_id=rule['category_id'],
+            category_name=self._cat_name[rule['category_id']],
+            source='keyword',
+            confidence=min(70, 50 + rule['priority']),  # Cap at 70
+            matched_keyword=rule['keyword'],
+            needs_review=True,  # Always review keyword matches
+            review_reason=f"Keyword match: '{rule['keyword']}'"
+        )
+
     def validate_category(self, category_id: str) -> bool:
         """Check if a category_id is valid."""
         return category_id in self.category_ids
@@ -81,24 +321,16 @@ class TransactionCategorizer:
         Returns:
             List of categories with hierarchy information
         """
-        # Group by parent
-        by_parent = {}
-        for cat in self.categories.values():
-            parent = cat.get('parent_category', '') or 'Other'
-            if parent not in by_parent:
-                by_parent[parent] = []
-            by_parent[parent].append(cat)
-        
         return {
             'categories': list(self.categories.values()),
-            'by_parent': by_parent,
-            'valid_ids': list(self.category_ids)
+            'by_parent': self.categories_by_parent,
+            'valid_ids': self.category_id_list
         }
     
     def apply_merchant_rules(
         self, 
         description: str
-    ) -> Optional[Dict[str, Any]]:
+    ) -> Optional[CategorizationResult]:
         """
         Try to match a transaction description against merchant rules.
         
@@ -109,39 +341,32 @@ class TransactionCategorizer:
             Match result or None if no match
         """
         desc_lower = description.lower()
+        best = None
         
-        for rule in self.merchant_rules:
-            pattern = rule['merchant_pattern']
-            
+        for matcher in self._short_merchant_matchers:
             # Check if pattern matches (substring match)
-            if pattern in desc_lower:
-                category_id = rule['category_id']
-                
-                # Validate category exists
-                if not self.validate_category(category_id):
-                    logger.warning(
-                        f"Merchant rule '{pattern}' references invalid "
-                        f"category '{category_id}'"
-                    )
-                    continue
-                
-                return {
-                    'category_id': category_id,
-                    'category_name': self.categories[category_id]['category_name'],
-                    'source': 'merchant_rule',
-                    'confidence': rule['confidence'],
-                    'matched_pattern': pattern,
-                    'needs_review': rule['confidence'] < CONFIDENCE_HIGH,
-                    'review_reason': f"Merchant rule confidence: {rule['confidence']}" 
-                        if rule['confidence'] < CONFIDENCE_HIGH else None
-                }
+            if matcher[1] in desc_lower:
+                best = matcher
+                break
         
-        return None
+        # The first rule (longest pattern) found anywhere wins. Buckets are
+        # in rule order, so stop at the first hit or once a candidate can
+        # no longer beat the best match so far.
+        lookup = self._merchant_prefix_index.get
+        for i in range(len(desc_lower) - MERCHANT_PREFIX_LEN + 1):
+            for matcher in lookup(desc_lower[i:i + MERCHANT_PREFIX_LEN], ()):
+                if best is not None and matcher[0] >= best[0]:
+                    break
+                if desc_lower.startswith(matcher[1], i):
+                    best = matcher
+                    break
+        
+        return CategorizationResult(*best[2]) if best is not None else None
     
     def apply_keyword_rules(
         self, 
         description: str
-    ) -> Optional[Dict[str, Any]]:
+    ) -> Optional[CategorizationResult]:
         """
         Try to match transaction description against keyword rules.
         
@@ -153,31 +378,14 @@ class TransactionCategorizer:
         """
         desc_lower = description.lower()
         
-        matches = []
-        for rule in self.keyword_rules:
-            keyword = rule['keyword']
-            
-            # Word boundary match (not substring)
-            if re.search(rf'\b{re.escape(keyword)}\b', desc_lower):
-                if self.validate_category(rule['category_id']):
-                    matches.append(rule)
-        
-        if not matches:
-            return None
-        
-        # Sort by priority (higher = better)
-        matches.sort(key=lambda x: x['priority'], reverse=True)
-        best = matches[0]
+        # Rules are pre-sorted by priority (highest first), so the first
+        # match is the best one. The plain substring test is a cheap
+        # prefilter - the regex only runs to confirm word boundaries.
+        for keyword, pattern, result_args in self._keyword_patterns:
+            if keyword in desc_lower and pattern.search(desc_lower):
+                return CategorizationResult(*result_args)
         
-        return {
-            'category_id': best['category_id'],
-            'category_name': self.categories[best['category_id']]['category_name'],
-            'source': 'keyword',
-            'confidence': min(70, 50 + best['priority']),  # Cap at 70
-            'matched_keyword': best['keyword'],
-            'needs_review': True,  # Always review keyword matches
-            'review_reason': f"Keyword match: '{best['keyword']}'"
-        }
+        return None
     
     def is_ambiguous_merchant(self, description: str) -> Tuple[bool, Optional[str]]:
         """
@@ -197,7 +405,7 @@ class TransactionCategorizer:
     def categorize_transaction(
         self, 
         transaction: Dict[str, Any]
-    ) -> Dict[str, Any]:
+    ) -> CategorizationResult:
         """
         Attempt to categorize a single transaction.
         
@@ -216,19 +424,23 @@ class TransactionCategorizer:
         """
         description = transaction.get(COL_DESCRIPTION, '')
         
+        # The result depends only on the description, and repeat merchants
+        # are common, so results are memoized per categorizer; each caller
+        # still gets its own instance
+        return CategorizationResult(*self._categorize_description(description))
+    
+    def _categorize_description_uncached(self, description: str) -> CategorizationResult:
+        """Run the rule layers for one description (see categorize_transaction)."""
         if not description:
-            return {
-                'category_id': None,
-                'source': None,
-                'needs_claude': True,
-                'needs_review': True,
-                'review_reason': 'Empty description'
-            }
+            return CategorizationResult(
+                needs_claude=True,
+                needs_review=True,
+                review_reason='Empty description'
+            )
         
         # Step 1: Try merchant rules (most deterministic)
         merchant_result = self.apply_merchant_rules(description)
-        if merchant_result and merchant_result['confidence'] >= CONFIDENCE_HIGH:
-            merchant_result['needs_claude'] = False
+        if merchant_result and merchant_result.confidence >= CONFIDENCE_HIGH:
             return merchant_result
         
         # Step 2: Check if ambiguous merchant (Amazon, Target, Costco, Walmart)
@@ -237,31 +449,58 @@ class TransactionCategorizer:
         # so they won't hit this check and will go through normal rules.
         is_ambiguous, merchant = self.is_ambiguous_merchant(description)
         if is_ambiguous:
-            return {
-                'category_id': None,
-                'source': None,
-                'needs_claude': True,  # Let Claude try to categorize
-                'needs_review': True,  # Flag for review since it's ambiguous
-                'review_reason': f"Ambiguous merchant: {merchant}",
-                'merchant_rule_hint': merchant_result  # Pass along if we have one
-            }
+            return CategorizationResult(
+                needs_claude=True,  # Let Claude try to categorize
+                needs_review=True,  # Flag for review since it's ambiguous
+                review_reason=f"Ambiguous merchant: {merchant}",
+                merchant_rule_hint=merchant_result  # Pass along if we have one
+            )
         
         # Step 3: Try keyword rules
         keyword_result = self.apply_keyword_rules(description)
         if keyword_result:
-            keyword_result['needs_claude'] = False
             return keyword_result
         
         # Step 4: Return for Claude to handle
-        return {
-            'category_id': None,
-            'source': None,
-            'needs_claude': True,
-            'needs_review': False,
-            'review_reason': None,
-            'merchant_rule_hint': merchant_result  # Pass along low-confidence match
-        }
+        return CategorizationResult(
+            needs_claude=True,
+            merchant_rule_hint=merchant_result  # Pass along low-confidence match
+        )
     
+    def iter_categorize(
+        self,
+        transactions: Iterable[Dict[str, Any]]
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Lazily categorize transactions, yielding (bucket, transaction) pairs.
+
+        Nothing is materialized: each transaction is yielded as soon as it is
+        categorized, as a shallow copy with its result under
+        '_categorization', so callers can stream writes while categorization
+        is still running. The input dicts are left untouched.
+
+        Buckets:
+        - 'needs_claude': rules couldn't decide (unknown or ambiguous merchant)
+        - 'needs_review': categorized by rules but should be reviewed
+        - 'auto_categorized': categorized by rules, no review needed
+
+        Args:
+            transactions: Iterable of transaction dicts
+
+        Yields:
+            (bucket, transaction) tuples
+        """
+        for trans in transactions:
+            result = self.categorize_transaction(trans)
+            trans = {**trans, '_categorization': result}
+
+            if result.needs_claude:
+                yield 'needs_claude', trans
+            elif result.needs_review:
+                yield 'needs_review', trans
+            elif result.category_id:
+                yield 'auto_categorized', trans
+
     def categorize_batch(
         self,
         transactions: List[Dict[str, Any]]
@@ -274,6 +513,9 @@ class TransactionCategorizer:
         - needs_claude: Need Claude's judgment (unknown merchants + ambiguous)
         - needs_review: Have a category but should be reviewed
 
+        The lists hold annotated copies of the transactions (see
+        iter_categorize).
+
         Args:
             transactions: List of transaction dicts
 
@@ -284,24 +526,14 @@ class TransactionCategorizer:
         needs_claude = []
         needs_review = []
 
-        for trans in transactions:
-            result = self.categorize_transaction(trans)
-
-            # Attach result to transaction
-            trans_with_result = {
-                **trans,
-                '_categorization': result
-            }
-
-            if result.get('needs_claude'):
-                # Unknown or ambiguous - needs Claude's judgment
-                needs_claude.append(trans_with_result)
-            elif result.get('needs_review'):
-                needs_review.append(trans_with_result)
-                auto_categorized.append(trans_with_result)
-            elif result.get('category_id'):
-                # Successfully categorized by rules
-                auto_categorized.append(trans_with_result)
+        for bucket, trans in self.iter_categorize(transactions):
+            if bucket == 'needs_claude':
+                needs_claude.append(trans)
+            else:
+                # needs_review transactions are still auto-categorized
+                auto_categorized.append(trans)
+                if bucket == 'needs_review':
+                    needs_review.append(trans)
 
         logger.info(
             f"Batch results: {len(auto_categorized)} auto-categorized, "
@@ -337,9 +569,9 @@ class TransactionCategorizer:
             
             # Include hint if available
             hint = ''
-            cat_info = trans.get('_categorization', {})
-            if cat_info.get('review_reason'):
-                hint = f" (Note: {cat_info['review_reason']})"
+            cat_info = trans.get('_categorization')
+            if cat_info is not None and cat_info.review_reason:
+                hint = f" (Note: {cat_info.review_reason})"
             
             lines.append(f"{i}. [Row {row_num}] {desc} | {amount}{hint}")
         
@@ -386,17 +618,17 @@ def test_categorization():
     print("\n=== Auto-Categorized ===")
     for trans in results['auto_categorized']:
         cat = trans['_categorization']
-        print(f"  {trans[COL_DESCRIPTION][:30]}: {cat['category_id']} ({cat['source']}, {cat['confidence']}%)")
+        print(f"  {trans[COL_DESCRIPTION][:30]}: {cat.category_id} ({cat.source}, {cat.confidence}%)")
     
     print("\n=== Needs Claude ===")
     for trans in results['needs_claude']:
         cat = trans['_categorization']
-        print(f"  {trans[COL_DESCRIPTION][:30]}: {cat.get('review_reason', 'No rules matched')}")
+        print(f"  {trans[COL_DESCRIPTION][:30]}: {cat.review_reason or 'No rules matched'}")
     
     print("\n=== Needs Review ===")
     for trans in results['needs_review']:
         cat = trans['_categorization']
-        print(f"  {trans[COL_DESCRIPTION][:30]}: {cat['review_reason']}")
+        print(f"  {trans[COL_DESCRIPTION][:30]}: {cat.review_reason}")
 
 
 if __name__ == '__main__':
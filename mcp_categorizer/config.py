@@ -28,6 +28,9 @@ CONFIG_KEYWORDS_TAB = 'Keywords'
 # Batch size for processing transactions
 BATCH_SIZE = 50
 
+# Max category updates per Sheets batchUpdate when streaming writes
+WRITE_BATCH_SIZE = 500
+
 # Confidence thresholds
 CONFIDENCE_HIGH = 80      # Auto-apply without review
 CONFIDENCE_MEDIUM = 50    # Apply but flag for review
@@ -85,6 +88,9 @@ CATEGORIZATION_COLUMNS = [
 MCP_SERVER_NAME = 'budget-categorizer'
 MCP_SERVER_VERSION = '1.4.0'  # Added query, bulk_update, reset, spending_summary, dashboard tools
 
+# Tool responses are compact JSON; set PRETTY_JSON=true to indent them for debugging
+PRETTY_JSON = os.environ.get('PRETTY_JSON', 'false').lower() == 'true'
+
 # ============================================================================
 # LOGGING
 # ============================================================================
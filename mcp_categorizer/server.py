@@ -10,11 +10,16 @@ Exposes tools for Claude to:
 - Get stats and flag for review
 """
 
+import asyncio
 import json
 import logging
 import os
 import subprocess
 import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
 from typing import Any, Optional
 
 # Add the mcp_categorizer directory to Python path
@@ -23,10 +28,16 @@ _server_dir = os.path.dirname(os.path.abspath(__file__))
 if _server_dir not in sys.path:
     sys.path.insert(0, _server_dir)
 
+# bulk_categorizer is imported on first use by bulk_categorize_api
+_BULK_CATEGORIZER_DIR = os.path.join(os.path.dirname(_server_dir), 'bulk_categorizer')
+
+# The in-flight bulk_categorize_api run, if any: (task, stop event). Only one
+# run may write to the sheet at a time.
+_bulk_run = None
+
 # MCP SDK imports
 try:
     from mcp.server import Server
-    from mcp.server.stdio import stdio_server
     from mcp.types import Tool, TextContent
 except ImportError:
     print("MCP SDK not installed. Run: pip install mcp", file=sys.stderr)
@@ -36,18 +47,55 @@ from config import (
     MCP_SERVER_NAME,
     MCP_SERVER_VERSION,
     LOG_LEVEL,
+    PRETTY_JSON,
     BATCH_SIZE,
-    PROCESSED_TRANSACTIONS_SHEET_ID,
-    PROCESSED_TRANSACTIONS_SHEET_NAME,
+    WRITE_BATCH_SIZE,
     validate_config,
 )
-from sheets_client import get_sheets_client
-from categorizer import TransactionCategorizer
+from categorizer import TransactionCategorizer, top_category_by_pattern
+
+# orjson is an optional speedup; fall back to stdlib json when absent
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a tool response as compact JSON (indented if PRETTY_JSON), using orjson when available."""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if PRETTY_JSON else 0)
+        return orjson.dumps(obj, option=option).decode('utf-8')
+    if PRETTY_JSON:
+        return json.dumps(obj, indent=2)
+    return json.dumps(obj, separators=(',', ':'))
+
+
+# Shared Sheets client, held here so handlers skip the import lookup per call
+_sheets_client = None
+
+
+def get_sheets_client():
+    """
+    Get the shared Sheets client.
+
+    sheets_client pulls in the Google API and auth libraries, so it is
+    imported on first use rather than when the server module loads.
+    """
+    global _sheets_client
+    if _sheets_client is None:
+        from sheets_client import get_sheets_client as _get_sheets_client
+        _sheets_client = _get_sheets_client()
+    return _sheets_client
 
 # ============================================================================
 # KEYCHAIN HELPERS
 # ============================================================================
 
+# Keychain lookup result, cached so we only fork `security` once per process
+_keychain_api_key = None
+
+
 def get_anthropic_api_key() -> Optional[str]:
     """
     Fetch Anthropic API key from macOS Keychain.
@@ -55,12 +103,20 @@ def get_anthropic_api_key() -> Optional[str]:
     Checks (in order):
     1. ANTHROPIC_API_KEY environment variable
     2. macOS Keychain entry (set KEYCHAIN_SERVICE_NAME env var, default: budget-categorizer-api-key)
+
+    A key found in the Keychain is cached for the life of the process;
+    misses are not cached, so a key added later is still picked up.
     """
+    global _keychain_api_key
+
     # First check env var (for flexibility)
     env_key = os.environ.get('ANTHROPIC_API_KEY')
     if env_key:
         return env_key
 
+    if _keychain_api_key is not None:
+        return _keychain_api_key
+
     # Try macOS Keychain
     try:
         result = subprocess.run(
@@ -71,7 +127,8 @@ def get_anthropic_api_key() -> Optional[str]:
             timeout=5
         )
         if result.returncode == 0:
-            return result.stdout.strip()
+            _keychain_api_key = result.stdout.strip()
+            return _keychain_api_key
     except Exception:
         pass
 
@@ -116,18 +173,112 @@ def reload_categorizer():
     """Force reload of categorizer (when config changes)."""
     global _categorizer
     _categorizer = None
+    get_sheets_client().invalidate_categories_cache()
     return get_categorizer()
 
 
+def invalidate_transaction_caches():
+    """
+    Drop the shared client's cached transaction state.
+
+    Call after anything outside the shared client (helper scripts, the bulk
+    run's own SheetsClient) may have written Processed Transactions.
+    """
+    if _sheets_client is not None:
+        _sheets_client.invalidate_transaction_caches()
+
+
+def add_rules_to_categorizer(rules: list[dict[str, Any]]) -> TransactionCategorizer:
+    """
+    Fold merchant rules just appended to the sheet into the categorizer.
+
+    Cheaper than reload_categorizer(): no config is re-read from Sheets.
+    Use reload_categorizer() when the sheet may have been edited elsewhere.
+    """
+    global _categorizer
+    _categorizer = get_categorizer().with_merchant_rules(rules)
+    return _categorizer
+
+
 # ============================================================================
 # MCP TOOL DEFINITIONS
 # ============================================================================
 
-@server.list_tools()
-async def list_tools() -> list[Tool]:
-    """Return list of available tools."""
+# Schema fragments shared verbatim by several tools below
+_DATE_FROM = {"type": "string", "description": "Start date YYYY-MM-DD"}
+_DATE_TO = {"type": "string", "description": "End date YYYY-MM-DD"}
+_FILTER_DATE_FROM = {"type": "string", "description": "Filter: start date YYYY-MM-DD"}
+_FILTER_DATE_TO = {"type": "string", "description": "Filter: end date YYYY-MM-DD"}
+_DRY_RUN_PREVIEW = {
+    "type": "boolean",
+    "description": "Preview changes without writing (default: true)",
+    "default": True
+}
+_BATCH_LIMIT_DESCRIPTION = f"Max transactions to return (default: {BATCH_SIZE})"
+
+# Transaction filters shared by query_transactions, bulk_update_category and
+# reset_categories. Each tool lists the keys it supports; the same tuple
+# drives both its schema and its argument handling so the two can't drift.
+_FILTER_PROPS = {
+    "category": {
+        "type": "string",
+        "description": "Filter: exact claude_category (e.g., 'groceries')"
+    },
+    "description_pattern": {
+        "type": "string",
+        "description": "Filter: case-insensitive substring on Description"
+    },
+    "date_from": _FILTER_DATE_FROM,
+    "date_to": _FILTER_DATE_TO,
+    "source": {
+        "type": "string",
+        "description": "Filter: category_source (merchant_rule, keyword, claude, manual)"
+    },
+    "needs_review": {
+        "type": "boolean",
+        "description": "Filter: only flagged-for-review transactions"
+    },
+    "amount_min": {
+        "type": "number",
+        "description": "Filter: minimum amount (use negative for expenses, e.g., -100)"
+    },
+    "amount_max": {"type": "number", "description": "Filter: maximum amount"},
+    "uncategorized_only": {
+        "type": "boolean",
+        "description": "Filter: only transactions without a category"
+    },
+    "account": {"type": "string", "description": "Filter: account name (substring match)"},
+}
+_QUERY_FILTER_KEYS = ('category', 'description_pattern', 'date_from', 'date_to',
+                      'source', 'needs_review', 'amount_min', 'amount_max',
+                      'uncategorized_only', 'account')
+_BULK_UPDATE_FILTER_KEYS = ('category', 'description_pattern', 'date_from', 'date_to',
+                            'source', 'amount_min', 'amount_max', 'account')
+_RESET_FILTER_KEYS = ('category', 'description_pattern', 'source', 'date_from',
+                      'date_to', 'needs_review')
+
+
+def _filter_props(keys: tuple) -> dict:
+    """Schema properties for the given filter keys."""
+    return {k: _FILTER_PROPS[k] for k in keys}
+
+
+def _filters_from_arguments(arguments: dict, keys: tuple) -> dict:
+    """Collect the filters in keys that were passed with a non-null value."""
+    return {k: arguments[k] for k in keys if arguments.get(k) is not None}
+
+@lru_cache(maxsize=1)
+def _build_tools() -> list[Tool]:
+    """
+    Build the tool manifest.
+
+    The manifest is static (it does not depend on config), so it is built
+    once on the first list_tools request and cached. The schemas are literals
+    written here, so Tools are built with model_construct() to skip
+    pydantic validation.
+    """
     return [
-        Tool(
+        Tool.model_construct(
             name="batch_apply_all_rules",
             description="""PRIMARY TOOL: Apply all deterministic rules to ALL uncategorized transactions.
 
@@ -158,7 +309,7 @@ After running this, only call Claude for the 'needs_claude' transactions if any
                 }
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="get_uncategorized_transactions",
             description="""Get transactions that don't have a category yet.
 
@@ -171,7 +322,7 @@ NOTE: Consider using batch_apply_all_rules instead - it processes everything at
                 "properties": {
                     "limit": {
                         "type": "integer",
-                        "description": f"Max transactions to return (default: {BATCH_SIZE})",
+                        "description": _BATCH_LIMIT_DESCRIPTION,
                         "default": BATCH_SIZE
                     },
                     "offset": {
@@ -182,7 +333,7 @@ NOTE: Consider using batch_apply_all_rules instead - it processes everything at
                 }
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="get_category_taxonomy",
             description="""Get the list of valid budget categories.
 
@@ -195,7 +346,7 @@ IMPORTANT: Only use category_ids from this list when writing categories.""",
                 "properties": {}
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="apply_rules_to_transactions",
             description="""Apply merchant and keyword rules to transactions.
 
@@ -234,7 +385,7 @@ Call this BEFORE making your own categorization decisions.""",
                 "required": ["transactions"]
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="write_categories",
             description="""Write category assignments back to the sheet.
 
@@ -270,7 +421,7 @@ This is IDEMPOTENT - safe to retry if there's an error.""",
                 "required": ["updates"]
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="get_categorization_stats",
             description="""Get statistics about categorization progress.
 
@@ -286,12 +437,13 @@ Returns:
                 "properties": {}
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="flag_for_review",
             description="""Flag a specific transaction for human review.
 
 Use this when you're unsure about a categorization or when the
-transaction is ambiguous.""",
+transaction is ambiguous. Pass row_numbers to flag several transactions
+with the same reason in one call.""",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -299,15 +451,20 @@ transaction is ambiguous.""",
                         "type": "integer",
                         "description": "The row number to flag"
                     },
+                    "row_numbers": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "description": "Several row numbers to flag (instead of row_number)"
+                    },
                     "reason": {
                         "type": "string",
                         "description": "Why this needs review"
                     }
                 },
-                "required": ["row_number", "reason"]
+                "required": ["reason"]
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="reload_config",
             description="""Reload categories, merchant rules, and keywords from config sheet.
 
@@ -318,7 +475,7 @@ pick up the changes without restarting.""",
                 "properties": {}
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="validate_category",
             description="""Check if a category_id is valid.
 
@@ -335,7 +492,7 @@ Use this to validate before writing if unsure.""",
                 "required": ["category_id"]
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="add_merchant_rule",
             description="""Add a new merchant rule to the Budget Config sheet.
 
@@ -370,7 +527,7 @@ After adding, call reload_config to pick up the new rule immediately.""",
                 "required": ["merchant_pattern", "category_id"]
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="add_keyword",
             description="""Add a new keyword rule to the Budget Config sheet.
 
@@ -398,7 +555,7 @@ Keywords are checked after merchant rules and suggest (not guarantee) a category
                 "required": ["keyword", "category_id"]
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="audit_merchant_rules",
             description="""Audit merchant rules for potential problems.
 
@@ -419,7 +576,7 @@ Use this to debug unexpected categorization behavior (like CalDigit → grocerie
                 }
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="migrate_category",
             description="""Migrate all transactions from one category_id to another.
 
@@ -446,7 +603,7 @@ BEFORE calling this tool. This only updates the transaction history.""",
         # ====================================================================
         # QUERY, UPDATE & REPORTING TOOLS
         # ====================================================================
-        Tool(
+        Tool.model_construct(
             name="query_transactions",
             description="""Search and filter transactions with flexible criteria.
 Examples:
@@ -459,46 +616,7 @@ Returns paginated results with optional category_summary breakdown.""",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "category": {
-                        "type": "string",
-                        "description": "Filter by exact claude_category (e.g., 'groceries')"
-                    },
-                    "description_pattern": {
-                        "type": "string",
-                        "description": "Case-insensitive substring match on Description"
-                    },
-                    "date_from": {
-                        "type": "string",
-                        "description": "Start date (YYYY-MM-DD)"
-                    },
-                    "date_to": {
-                        "type": "string",
-                        "description": "End date (YYYY-MM-DD)"
-                    },
-                    "source": {
-                        "type": "string",
-                        "description": "Filter by category_source (merchant_rule, keyword, claude, manual)"
-                    },
-                    "needs_review": {
-                        "type": "boolean",
-                        "description": "Filter to only flagged-for-review transactions"
-                    },
-                    "amount_min": {
-                        "type": "number",
-                        "description": "Minimum amount (use negative for expenses, e.g., -100)"
-                    },
-                    "amount_max": {
-                        "type": "number",
-                        "description": "Maximum amount"
-                    },
-                    "uncategorized_only": {
-                        "type": "boolean",
-                        "description": "Only return transactions without a category"
-                    },
-                    "account": {
-                        "type": "string",
-                        "description": "Filter by account name (substring match)"
-                    },
+                    **_filter_props(_QUERY_FILTER_KEYS),
                     "limit": {
                         "type": "integer",
                         "description": "Max results to return (default: 50)",
@@ -512,7 +630,7 @@ Returns paginated results with optional category_summary breakdown.""",
                 }
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="bulk_update_category",
             description="""Change the category for all transactions matching your criteria.
 Examples:
@@ -526,30 +644,13 @@ IMPORTANT: Use dry_run=true first to preview changes. At least one filter is req
                         "type": "string",
                         "description": "The category to assign to matching transactions"
                     },
-                    "category": {
-                        "type": "string",
-                        "description": "Filter: current claude_category"
-                    },
-                    "description_pattern": {
-                        "type": "string",
-                        "description": "Filter: case-insensitive substring on Description"
-                    },
-                    "date_from": {"type": "string", "description": "Filter: start date YYYY-MM-DD"},
-                    "date_to": {"type": "string", "description": "Filter: end date YYYY-MM-DD"},
-                    "source": {"type": "string", "description": "Filter: category_source"},
-                    "amount_min": {"type": "number", "description": "Filter: minimum amount"},
-                    "amount_max": {"type": "number", "description": "Filter: maximum amount"},
-                    "account": {"type": "string", "description": "Filter: account name"},
-                    "dry_run": {
-                        "type": "boolean",
-                        "description": "Preview changes without writing (default: true)",
-                        "default": True
-                    }
+                    **_filter_props(_BULK_UPDATE_FILTER_KEYS),
+                    "dry_run": _DRY_RUN_PREVIEW
                 },
                 "required": ["new_category_id"]
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="reset_categories",
             description="""Clear categories so transactions can be re-categorized from scratch.
 Examples:
@@ -560,21 +661,12 @@ IMPORTANT: Use dry_run=true first. At least one filter is required.""",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "category": {"type": "string", "description": "Filter: claude_category to reset"},
-                    "description_pattern": {"type": "string", "description": "Filter: substring on Description"},
-                    "source": {"type": "string", "description": "Filter: category_source to reset"},
-                    "date_from": {"type": "string", "description": "Filter: start date YYYY-MM-DD"},
-                    "date_to": {"type": "string", "description": "Filter: end date YYYY-MM-DD"},
-                    "needs_review": {"type": "boolean", "description": "Filter: only flagged transactions"},
-                    "dry_run": {
-                        "type": "boolean",
-                        "description": "Preview changes without writing (default: true)",
-                        "default": True
-                    }
+                    **_filter_props(_RESET_FILTER_KEYS),
+                    "dry_run": _DRY_RUN_PREVIEW
                 }
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="get_spending_summary",
             description="""Get spending totals by category for a time period, with budget comparison.
 Examples:
@@ -584,18 +676,12 @@ Returns hierarchical breakdown: parent categories → categories → totals + bu
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "date_from": {
-                        "type": "string",
-                        "description": "Start date YYYY-MM-DD"
-                    },
-                    "date_to": {
-                        "type": "string",
-                        "description": "End date YYYY-MM-DD"
-                    }
+                    "date_from": _DATE_FROM,
+                    "date_to": _DATE_TO
                 }
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="generate_dashboard",
             description="""Generate a beautiful interactive HTML budget dashboard.
 Examples:
@@ -606,21 +692,15 @@ Includes summary cards, collapsible category groups with budget bars, and click-
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "date_from": {
-                        "type": "string",
-                        "description": "Start date YYYY-MM-DD"
-                    },
-                    "date_to": {
-                        "type": "string",
-                        "description": "End date YYYY-MM-DD"
-                    }
+                    "date_from": _DATE_FROM,
+                    "date_to": _DATE_TO
                 }
             }
         ),
         # ====================================================================
         # EMAIL BACKFILL TOOLS
         # ====================================================================
-        Tool(
+        Tool.model_construct(
             name="auto_categorize_batch",
             description="""AUTO-CATEGORIZATION LOOP: Process transactions in batches with merchant rule learning.
 
@@ -671,7 +751,7 @@ IMPORTANT: Examine 'next_batch' and respond with your categorizations.""",
                 }
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="bulk_categorize_api",
             description="""BULK CATEGORIZATION: Process large batches of transactions using Claude API directly.
 
@@ -725,7 +805,7 @@ COST: ~$0.04 per 100 transactions using claude-sonnet-4-20250514""",
                 }
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="run_email_backfill",
             description="""Run the email backfill script to fetch Amazon order/return emails from Gmail.
 
@@ -781,7 +861,7 @@ The script writes to the Parsed Orders sheet, which feeds into transaction match
                 "required": ["mode"]
             }
         ),
-        Tool(
+        Tool.model_construct(
             name="run_transaction_matcher",
             description="""Run the transaction matcher to match bank transactions with parsed Amazon orders.
 
@@ -817,1120 +897,1316 @@ And writes to:
     ]
 
 
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    """Return list of available tools."""
+    return _build_tools()
+
+
 # ============================================================================
 # MCP TOOL IMPLEMENTATIONS
 # ============================================================================
 
-@server.call_tool()
-async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
-    """Handle tool calls."""
-    
-    try:
-        if name == "get_uncategorized_transactions":
-            client = get_sheets_client()
-            limit = arguments.get('limit', BATCH_SIZE)
-            offset = arguments.get('offset', 0)
-            
-            transactions = client.get_uncategorized_transactions(limit=limit, offset=offset)
-            
-            # Simplify output for Claude
-            simplified = []
-            for t in transactions:
-                simplified.append({
-                    'row_number': t.get('_row_number'),
-                    'Date': t.get('Date', ''),
-                    'Description': t.get('Description', ''),
-                    'Amount': t.get('Amount', ''),
-                    'Account': t.get('Account', ''),
-                })
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps({
-                    'count': len(simplified),
-                    'transactions': simplified
-                }, indent=2)
-            )]
-
-        elif name == "batch_apply_all_rules":
-            client = get_sheets_client()
-            categorizer = get_categorizer()
-            dry_run = arguments.get('dry_run', False)
-            limit = arguments.get('limit', 10000)
-
-            # Step 1: Fetch ALL uncategorized transactions
-            logger.info(f"Fetching up to {limit} uncategorized transactions...")
-            transactions = client.get_uncategorized_transactions(limit=limit, offset=0)
-
-            if not transactions:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': True,
-                        'message': 'No uncategorized transactions found',
-                        'summary': {
-                            'total_processed': 0,
-                            'auto_categorized': 0,
-                            'written': 0,
-                            'needs_claude': 0,
-                            'skipped_ambiguous': 0
-                        }
-                    }, indent=2)
-                )]
-
-            # Step 2: Apply all rules in one batch
-            logger.info(f"Applying rules to {len(transactions)} transactions...")
-            results = categorizer.categorize_batch(transactions)
-
-            # Step 3: Prepare updates for auto-categorized transactions
-            updates = []
-            for t in results['auto_categorized']:
-                cat_info = t['_categorization']
-                updates.append({
-                    'row_number': t.get('_row_number'),
-                    'category_id': cat_info['category_id'],
-                    'source': cat_info['source'],
-                    'confidence': cat_info['confidence'],
-                    'needs_review': cat_info.get('needs_review', False),
-                    'review_reason': cat_info.get('review_reason', '')
-                })
+# Tool name -> async handler, filled in by @_tool_handler below
+_TOOL_HANDLERS = {}
+
 
-            # Step 4: Write all results (unless dry run)
-            write_result = {'success_count': 0, 'error_count': 0}
-            if updates and not dry_run:
-                logger.info(f"Writing {len(updates)} categorizations...")
-                write_result = client.write_categories(updates)
+def _tool_handler(name: str):
+    """Register the decorated coroutine as the handler for tool `name`."""
+    def register(func):
+        _TOOL_HANDLERS[name] = func
+        return func
+    return register
 
-            # Step 5: Build response
-            output = {
+
+def _rule_update(trans: dict[str, Any]) -> dict[str, Any]:
+    """Build a write_categories() update for a rule-categorized transaction."""
+    cat_info = trans['_categorization']
+    return {
+        'row_number': trans.get('_row_number'),
+        'category_id': cat_info.category_id,
+        'source': cat_info.source,
+        'confidence': cat_info.confidence,
+        'needs_review': cat_info.needs_review,
+        'review_reason': cat_info.review_reason or ''
+    }
+
+
+@_tool_handler("get_uncategorized_transactions")
+async def _tool_get_uncategorized_transactions(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    limit = arguments.get('limit', BATCH_SIZE)
+    offset = arguments.get('offset', 0)
+    
+    transactions = client.get_uncategorized_transactions(limit=limit, offset=offset)
+    
+    # Simplify output for Claude
+    simplified = []
+    for t in transactions:
+        simplified.append({
+            'row_number': t.get('_row_number'),
+            'Date': t.get('Date', ''),
+            'Description': t.get('Description', ''),
+            'Amount': t.get('Amount', ''),
+            'Account': t.get('Account', ''),
+        })
+    
+    return [TextContent(
+        type="text",
+        text=_dumps({
+            'count': len(simplified),
+            'transactions': simplified
+        })
+    )]
+
+
+@_tool_handler("batch_apply_all_rules")
+async def _tool_batch_apply_all_rules(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    categorizer = get_categorizer()
+    dry_run = arguments.get('dry_run', False)
+    limit = arguments.get('limit', 10000)
+
+    # Step 1: Fetch ALL uncategorized transactions
+    logger.info(f"Fetching up to {limit} uncategorized transactions...")
+    transactions = client.get_uncategorized_transactions(limit=limit, offset=0)
+
+    if not transactions:
+        return [TextContent(
+            type="text",
+            text=_dumps({
                 'success': True,
-                'dry_run': dry_run,
+                'message': 'No uncategorized transactions found',
                 'summary': {
-                    'total_processed': len(transactions),
-                    'auto_categorized': len(results['auto_categorized']),
-                    'written': write_result.get('success_count', 0) if not dry_run else 0,
-                    'write_errors': write_result.get('error_count', 0),
-                    'needs_claude': len(results['needs_claude']),
-                    'needs_review': len(results['needs_review']),
-                },
-                'by_source': {},
-                'needs_claude': [
-                    {
-                        'row_number': t.get('_row_number'),
-                        'Description': t.get('Description', ''),
-                        'Amount': t.get('Amount', ''),
-                        'hint': t['_categorization'].get('review_reason', 'No rules matched'),
-                    }
-                    for t in results['needs_claude'][:50]  # Limit to first 50
-                ],
+                    'total_processed': 0,
+                    'auto_categorized': 0,
+                    'written': 0,
+                    'needs_claude': 0,
+                    'skipped_ambiguous': 0
+                }
+            })
+        )]
+
+    # Step 2: Apply all rules, streaming auto-categorized rows to the
+    # sheet in WRITE_BATCH_SIZE chunks while categorization continues
+    logger.info(f"Applying rules to {len(transactions)} transactions...")
+    auto_categorized_count = 0
+    needs_review_count = 0
+    needs_claude = []
+    by_source = Counter()
+    pending_updates = []
+    write_result = {'success_count': 0, 'error_count': 0}
+
+    def flush_updates():
+        logger.info(f"Writing {len(pending_updates)} categorizations...")
+        part = client.write_categories(pending_updates)
+        write_result['success_count'] += part.get('success_count', 0)
+        write_result['error_count'] += part.get('error_count', 0)
+        pending_updates.clear()
+
+    for bucket, t in categorizer.iter_categorize(transactions):
+        if bucket == 'needs_claude':
+            needs_claude.append(t)
+            continue
+
+        auto_categorized_count += 1
+        if bucket == 'needs_review':
+            needs_review_count += 1
+
+        source = t['_categorization'].source or 'unknown'
+        by_source[source] += 1
+
+        # Step 3: Queue the update (unless dry run)
+        if dry_run:
+            continue
+        pending_updates.append(_rule_update(t))
+        if len(pending_updates) >= WRITE_BATCH_SIZE:
+            flush_updates()
+
+    # Step 4: Write whatever is left in the final partial chunk
+    if pending_updates:
+        flush_updates()
+
+    # Step 5: Build response
+    output = {
+        'success': True,
+        'dry_run': dry_run,
+        'summary': {
+            'total_processed': len(transactions),
+            'auto_categorized': auto_categorized_count,
+            'written': write_result['success_count'],
+            'write_errors': write_result['error_count'],
+            'needs_claude': len(needs_claude),
+            'needs_review': needs_review_count,
+        },
+        'by_source': dict(by_source),
+        'needs_claude': [
+            {
+                'row_number': t.get('_row_number'),
+                'Description': t.get('Description', ''),
+                'Amount': t.get('Amount', ''),
+                'hint': t['_categorization'].review_reason or 'No rules matched',
             }
+            for t in needs_claude[:50]  # Limit to first 50
+        ],
+    }
+
+    # Add note if there are more needs_claude than shown
+    if len(needs_claude) > 50:
+        output['needs_claude_note'] = f"Showing 50 of {len(needs_claude)} - use get_uncategorized_transactions for full list"
+
+    return [TextContent(
+        type="text",
+        text=_dumps(output)
+    )]
 
-            # Count by source
-            for t in results['auto_categorized']:
-                source = t['_categorization'].get('source', 'unknown')
-                output['by_source'][source] = output['by_source'].get(source, 0) + 1
-
-            # Add note if there are more needs_claude than shown
-            if len(results['needs_claude']) > 50:
-                output['needs_claude_note'] = f"Showing 50 of {len(results['needs_claude'])} - use get_uncategorized_transactions for full list"
-
-            return [TextContent(
-                type="text",
-                text=json.dumps(output, indent=2)
-            )]
-
-        elif name == "get_category_taxonomy":
-            categorizer = get_categorizer()
-            taxonomy = categorizer.get_category_taxonomy()
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps(taxonomy, indent=2)
-            )]
+
+@_tool_handler("get_category_taxonomy")
+async def _tool_get_category_taxonomy(arguments: dict[str, Any]) -> list[TextContent]:
+    categorizer = get_categorizer()
+    taxonomy = categorizer.get_category_taxonomy()
+    
+    return [TextContent(
+        type="text",
+        text=_dumps(taxonomy)
+    )]
+
+
+@_tool_handler("apply_rules_to_transactions")
+async def _tool_apply_rules_to_transactions(arguments: dict[str, Any]) -> list[TextContent]:
+    categorizer = get_categorizer()
+    transactions = arguments.get('transactions', [])
+    filter_parent_categories = arguments.get('filter_parent_categories', [])
+    filter_categories = arguments.get('filter_categories', [])
+    
+    # Re-add _row_number as it may have been stripped
+    for t in transactions:
+        if 'row_number' in t and '_row_number' not in t:
+            t['_row_number'] = t['row_number']
+    
+    # Build filter set if filters specified
+    allowed_category_ids = set()
+    if filter_parent_categories or filter_categories:
+        # Add categories matching parent filter (pre-indexed by the categorizer)
+        for parent in filter_parent_categories:
+            allowed_category_ids.update(categorizer.category_ids_by_parent.get(parent, ()))
         
-        elif name == "apply_rules_to_transactions":
-            categorizer = get_categorizer()
-            client = get_sheets_client()
-            transactions = arguments.get('transactions', [])
-            filter_parent_categories = arguments.get('filter_parent_categories', [])
-            filter_categories = arguments.get('filter_categories', [])
-            
-            # Re-add _row_number as it may have been stripped
-            for t in transactions:
-                if 'row_number' in t and '_row_number' not in t:
-                    t['_row_number'] = t['row_number']
-            
-            results = categorizer.categorize_batch(transactions)
-            
-            # Build filter set if filters specified
-            allowed_category_ids = set()
-            if filter_parent_categories or filter_categories:
-                # Get categories to build parent->category mapping
-                categories = client.get_categories()
-                
-                # Add categories matching parent filter
-                if filter_parent_categories:
-                    for cat in categories:
-                        if cat.get('parent_category') in filter_parent_categories:
-                            allowed_category_ids.add(cat['category_id'])
-                
-                # Add explicitly filtered categories
-                if filter_categories:
-                    allowed_category_ids.update(filter_categories)
-                
-                logger.info(f"Filtering to categories: {allowed_category_ids}")
-            
-            # Filter function
-            def matches_filter(transaction):
-                if not allowed_category_ids:
-                    return True  # No filter, include all
-                cat_info = transaction.get('_categorization', {})
-                cat_id = cat_info.get('category_id', '')
-                return cat_id in allowed_category_ids
-            
-            # Apply filters
-            if allowed_category_ids:
-                filtered_auto = [t for t in results['auto_categorized'] if matches_filter(t)]
-                filtered_needs_claude = [t for t in results['needs_claude'] if matches_filter(t)]
-                skipped_count = (
-                    len(results['auto_categorized']) - len(filtered_auto) +
-                    len(results['needs_claude']) - len(filtered_needs_claude)
-                )
-            else:
-                filtered_auto = results['auto_categorized']
-                filtered_needs_claude = results['needs_claude']
-                skipped_count = 0
-            
-            # Format output
-            output = {
-                'summary': {
-                    'auto_categorized': len(filtered_auto),
-                    'needs_claude': len(filtered_needs_claude),
-                    'needs_review': len(results['needs_review']),
-                    'skipped_by_filter': skipped_count,
-                },
-                'filter_applied': {
-                    'parent_categories': filter_parent_categories,
-                    'categories': filter_categories,
-                    'allowed_category_ids': list(allowed_category_ids) if allowed_category_ids else None,
-                } if (filter_parent_categories or filter_categories) else None,
-                'auto_categorized': [
-                    {
-                        'row_number': t.get('_row_number'),
-                        'Description': t.get('Description', ''),
-                        'category_id': t['_categorization']['category_id'],
-                        'category_name': t['_categorization'].get('category_name', ''),
-                        'source': t['_categorization']['source'],
-                        'confidence': t['_categorization']['confidence'],
-                        'needs_review': t['_categorization'].get('needs_review', False),
-                        'review_reason': t['_categorization'].get('review_reason'),
-                    }
-                    for t in filtered_auto
-                ],
-                'needs_claude': [
-                    {
-                        'row_number': t.get('_row_number'),
-                        'Description': t.get('Description', ''),
-                        'Amount': t.get('Amount', ''),
-                        'hint': t['_categorization'].get('review_reason', 'No rules matched'),
-                    }
-                    for t in filtered_needs_claude
-                ],
-            }
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps(output, indent=2)
-            )]
+        # Add explicitly filtered categories
+        if filter_categories:
+            allowed_category_ids.update(filter_categories)
         
-        elif name == "write_categories":
-            client = get_sheets_client()
-            categorizer = get_categorizer()
-            updates = arguments.get('updates', [])
-            
-            # Validate all category_ids before writing
-            invalid = []
-            for update in updates:
-                if not categorizer.validate_category(update.get('category_id', '')):
-                    invalid.append({
-                        'row_number': update.get('row_number'),
-                        'invalid_category': update.get('category_id')
+        logger.info(f"Filtering to categories: {allowed_category_ids}")
+    
+    # Categorize, filter and format in a single pass
+    auto_categorized = []
+    needs_claude = []
+    needs_review_count = 0
+    skipped_count = 0
+    for bucket, t in categorizer.iter_categorize(transactions):
+        cat_info = t['_categorization']
+        if bucket == 'needs_review':
+            needs_review_count += 1
+        if allowed_category_ids and cat_info.category_id not in allowed_category_ids:
+            skipped_count += 1
+            continue
+        if bucket == 'needs_claude':
+            needs_claude.append({
+                'row_number': t.get('_row_number'),
+                'Description': t.get('Description', ''),
+                'Amount': t.get('Amount', ''),
+                'hint': cat_info.review_reason or 'No rules matched',
+            })
+        else:
+            auto_categorized.append({
+                'row_number': t.get('_row_number'),
+                'Description': t.get('Description', ''),
+                'category_id': cat_info.category_id,
+                'category_name': cat_info.category_name or '',
+                'source': cat_info.source,
+                'confidence': cat_info.confidence,
+                'needs_review': cat_info.needs_review,
+                'review_reason': cat_info.review_reason,
+            })
+    
+    # Format output
+    output = {
+        'summary': {
+            'auto_categorized': len(auto_categorized),
+            'needs_claude': len(needs_claude),
+            'needs_review': needs_review_count,
+            'skipped_by_filter': skipped_count,
+        },
+        'filter_applied': {
+            'parent_categories': filter_parent_categories,
+            'categories': filter_categories,
+            'allowed_category_ids': list(allowed_category_ids) if allowed_category_ids else None,
+        } if (filter_parent_categories or filter_categories) else None,
+        'auto_categorized': auto_categorized,
+        'needs_claude': needs_claude,
+    }
+    
+    return [TextContent(
+        type="text",
+        text=_dumps(output)
+    )]
+
+
+@_tool_handler("write_categories")
+async def _tool_write_categories(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    categorizer = get_categorizer()
+    updates = arguments.get('updates', [])
+    
+    # Validate all category_ids before writing
+    invalid = []
+    for update in updates:
+        if not categorizer.validate_category(update.get('category_id', '')):
+            invalid.append({
+                'row_number': update.get('row_number'),
+                'invalid_category': update.get('category_id')
+            })
+    
+    if invalid:
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'error': 'Invalid category IDs',
+                'invalid': invalid,
+                'valid_categories': categorizer.category_id_list
+            })
+        )]
+    
+    result = client.write_categories(updates)
+    
+    return [TextContent(
+        type="text",
+        text=_dumps(result)
+    )]
+
+
+@_tool_handler("get_categorization_stats")
+async def _tool_get_categorization_stats(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    stats = client.get_categorization_stats()
+    
+    return [TextContent(
+        type="text",
+        text=_dumps(stats)
+    )]
+
+
+@_tool_handler("flag_for_review")
+async def _tool_flag_for_review(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    row_number = arguments.get('row_number')
+    row_numbers = arguments.get('row_numbers')
+    reason = arguments.get('reason', 'Flagged for review')
+    
+    if row_numbers:
+        success = client.flag_rows_for_review(row_numbers, reason)
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': success,
+                'row_numbers': row_numbers,
+                'reason': reason
+            })
+        )]
+    
+    success = client.flag_for_review(row_number, reason)
+    
+    return [TextContent(
+        type="text",
+        text=_dumps({
+            'success': success,
+            'row_number': row_number,
+            'reason': reason
+        })
+    )]
+
+
+@_tool_handler("reload_config")
+async def _tool_reload_config(arguments: dict[str, Any]) -> list[TextContent]:
+    categorizer = reload_categorizer()
+    
+    return [TextContent(
+        type="text",
+        text=_dumps({
+            'success': True,
+            'categories_loaded': len(categorizer.categories),
+            'merchant_rules_loaded': len(categorizer.merchant_rules),
+            'keyword_rules_loaded': len(categorizer.keyword_rules),
+        })
+    )]
+
+
+@_tool_handler("validate_category")
+async def _tool_validate_category(arguments: dict[str, Any]) -> list[TextContent]:
+    categorizer = get_categorizer()
+    category_id = arguments.get('category_id', '')
+    is_valid = categorizer.validate_category(category_id)
+    
+    return [TextContent(
+        type="text",
+        text=_dumps({
+            'category_id': category_id,
+            'is_valid': is_valid,
+            'valid_categories': categorizer.category_id_list if not is_valid else None
+        })
+    )]
+
+
+def _audit_rules(
+    rules: list[dict],
+    invalid_rules: list[dict],
+    test_description: str,
+) -> tuple[list, list]:
+    """Run the merchant rule checks; returns (issues, matching_rules).
+
+    Pure CPU work with no Sheets access, so it is safe to run in a worker
+    thread while the event loop keeps serving other tool calls.
+    Every rule on the sheet is checked, including those with an invalid
+    category; only the active rules are tested against test_description.
+    """
+    issues = []
+    all_rules = rules + invalid_rules
+
+    # Check 1: Patterns too short
+    MIN_LENGTH = 4
+    short_patterns = [r for r in all_rules if len(r['merchant_pattern']) < MIN_LENGTH]
+    for r in short_patterns:
+        issues.append({
+            'type': 'short_pattern',
+            'severity': 'high',
+            'pattern': r['merchant_pattern'],
+            'category': r['category_id'],
+            'message': f"Pattern '{r['merchant_pattern']}' is only {len(r['merchant_pattern'])} chars - may cause false positives"
+        })
+
+    # Index rules by pattern once; shared by the overlap and
+    # duplicate checks below
+    by_pattern = {}
+    for r in all_rules:
+        by_pattern.setdefault(r['merchant_pattern'], []).append(r)
+    pattern_lengths = sorted({len(p) for p in by_pattern})
+
+    # Check 2: Overlapping patterns. Instead of testing every pair of
+    # rules, look up each pattern's substrings of the lengths that
+    # actually occur, which scales linearly with the rule count.
+    for p2, longer_rules in by_pattern.items():
+        contained = {}
+        for length in pattern_lengths:
+            if length >= len(p2):
+                break
+            for start in range(len(p2) - length + 1):
+                p1 = p2[start:start + length]
+                if p1 in by_pattern:
+                    contained[p1] = by_pattern[p1]
+        for p1, shorter_rules in contained.items():
+            for r1 in shorter_rules:
+                for r2 in longer_rules:
+                    issues.append({
+                        'type': 'overlap',
+                        'severity': 'medium',
+                        'pattern1': p1,
+                        'category1': r1['category_id'],
+                        'pattern2': p2,
+                        'category2': r2['category_id'],
+                        'message': f"'{p1}' is substring of '{p2}' - may shadow matches"
                     })
-            
-            if invalid:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'error': 'Invalid category IDs',
-                        'invalid': invalid,
-                        'valid_categories': list(categorizer.category_ids)
-                    }, indent=2)
-                )]
-            
-            result = client.write_categories(updates)
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, indent=2)
-            )]
-        
-        elif name == "get_categorization_stats":
-            client = get_sheets_client()
-            stats = client.get_categorization_stats()
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps(stats, indent=2)
-            )]
-        
-        elif name == "flag_for_review":
-            client = get_sheets_client()
-            row_number = arguments.get('row_number')
-            reason = arguments.get('reason', 'Flagged for review')
-            
-            success = client.flag_for_review(row_number, reason)
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps({
-                    'success': success,
-                    'row_number': row_number,
-                    'reason': reason
-                })
-            )]
-        
-        elif name == "reload_config":
-            categorizer = reload_categorizer()
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps({
-                    'success': True,
-                    'categories_loaded': len(categorizer.categories),
-                    'merchant_rules_loaded': len(categorizer.merchant_rules),
-                    'keyword_rules_loaded': len(categorizer.keyword_rules),
-                })
-            )]
-        
-        elif name == "validate_category":
-            categorizer = get_categorizer()
-            category_id = arguments.get('category_id', '')
-            is_valid = categorizer.validate_category(category_id)
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps({
-                    'category_id': category_id,
-                    'is_valid': is_valid,
-                    'valid_categories': list(categorizer.category_ids) if not is_valid else None
-                })
-            )]
-        
-        elif name == "audit_merchant_rules":
-            categorizer = get_categorizer()
-            test_description = arguments.get('test_description', '')
-
-            issues = []
-            rules = categorizer.merchant_rules
-
-            # Check 1: Patterns too short
-            MIN_LENGTH = 4
-            short_patterns = [r for r in rules if len(r['merchant_pattern']) < MIN_LENGTH]
-            for r in short_patterns:
-                issues.append({
-                    'type': 'short_pattern',
-                    'severity': 'high',
+
+    # Check 3: Invalid category references (dropped by the categorizer at load)
+    for r in invalid_rules:
+        issues.append({
+            'type': 'invalid_category',
+            'severity': 'high',
+            'pattern': r['merchant_pattern'],
+            'category': r['category_id'],
+            'message': f"Category '{r['category_id']}' does not exist - rule is ignored"
+        })
+
+    # Check 4: Duplicate patterns
+    for p, same_rules in by_pattern.items():
+        for r in same_rules[1:]:
+            issues.append({
+                'type': 'duplicate',
+                'severity': 'medium',
+                'pattern': p,
+                'category1': same_rules[0]['category_id'],
+                'category2': r['category_id'],
+                'message': f"Pattern '{p}' defined twice"
+            })
+
+    # Optional: Test which rules match a description
+    matching_rules = []
+    if test_description:
+        desc_lower = test_description.lower()
+        for r in rules:
+            if r['merchant_pattern'] in desc_lower:
+                matching_rules.append({
                     'pattern': r['merchant_pattern'],
                     'category': r['category_id'],
-                    'message': f"Pattern '{r['merchant_pattern']}' is only {len(r['merchant_pattern'])} chars - may cause false positives"
+                    'confidence': r['confidence'],
+                    'would_match': True
                 })
 
-            # Check 2: Overlapping patterns
-            for i, r1 in enumerate(rules):
-                p1 = r1['merchant_pattern']
-                for r2 in rules[i+1:]:
-                    p2 = r2['merchant_pattern']
-                    if p1 != p2:
-                        if p1 in p2:
-                            issues.append({
-                                'type': 'overlap',
-                                'severity': 'medium',
-                                'pattern1': p1,
-                                'category1': r1['category_id'],
-                                'pattern2': p2,
-                                'category2': r2['category_id'],
-                                'message': f"'{p1}' is substring of '{p2}' - may shadow matches"
-                            })
-                        elif p2 in p1:
-                            issues.append({
-                                'type': 'overlap',
-                                'severity': 'medium',
-                                'pattern1': p2,
-                                'category1': r2['category_id'],
-                                'pattern2': p1,
-                                'category2': r1['category_id'],
-                                'message': f"'{p2}' is substring of '{p1}' - may shadow matches"
-                            })
-
-            # Check 3: Invalid category references
-            for r in rules:
-                if not categorizer.validate_category(r['category_id']):
-                    issues.append({
-                        'type': 'invalid_category',
-                        'severity': 'high',
-                        'pattern': r['merchant_pattern'],
-                        'category': r['category_id'],
-                        'message': f"Category '{r['category_id']}' does not exist"
-                    })
+    return issues, matching_rules
 
-            # Check 4: Duplicate patterns
-            seen = {}
-            for r in rules:
-                p = r['merchant_pattern']
-                if p in seen:
-                    issues.append({
-                        'type': 'duplicate',
-                        'severity': 'medium',
-                        'pattern': p,
-                        'category1': seen[p],
-                        'category2': r['category_id'],
-                        'message': f"Pattern '{p}' defined twice"
-                    })
-                else:
-                    seen[p] = r['category_id']
-
-            # Optional: Test which rules match a description
-            matching_rules = []
-            if test_description:
-                desc_lower = test_description.lower()
-                for r in rules:
-                    if r['merchant_pattern'] in desc_lower:
-                        matching_rules.append({
-                            'pattern': r['merchant_pattern'],
-                            'category': r['category_id'],
-                            'confidence': r['confidence'],
-                            'would_match': True
-                        })
-
-            output = {
-                'total_rules': len(rules),
-                'issues_found': len(issues),
-                'issues': issues,
-                'rules_sorted_by': 'length (longest first for determinism)',
-            }
 
-            if test_description:
-                output['test_description'] = test_description
-                output['matching_rules'] = matching_rules
-                output['first_match'] = matching_rules[0] if matching_rules else None
-
-            return [TextContent(
-                type="text",
-                text=json.dumps(output, indent=2)
-            )]
-
-        elif name == "add_merchant_rule":
-            client = get_sheets_client()
-            categorizer = get_categorizer()
-            
-            merchant_pattern = arguments.get('merchant_pattern', '')
-            category_id = arguments.get('category_id', '')
-            confidence = arguments.get('confidence', 100)
-            notes = arguments.get('notes', '')
-            
-            # Validate category exists
-            if not categorizer.validate_category(category_id):
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': f"Invalid category_id: {category_id}",
-                        'valid_categories': list(categorizer.category_ids)
-                    })
-                )]
-            
-            result = client.add_merchant_rule(
-                merchant_pattern=merchant_pattern,
-                category_id=category_id,
-                confidence=confidence,
-                notes=notes
-            )
-            
-            # Auto-reload config if successful
-            if result.get('success'):
-                reload_categorizer()
-                result['config_reloaded'] = True
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, indent=2)
-            )]
-        
-        elif name == "add_keyword":
-            client = get_sheets_client()
-            categorizer = get_categorizer()
-            
-            keyword = arguments.get('keyword', '')
-            category_id = arguments.get('category_id', '')
-            priority = arguments.get('priority', 20)
-            
-            # Validate category exists
-            if not categorizer.validate_category(category_id):
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': f"Invalid category_id: {category_id}",
-                        'valid_categories': list(categorizer.category_ids)
-                    })
-                )]
-            
-            result = client.add_keyword(
-                keyword=keyword,
-                category_id=category_id,
-                priority=priority
-            )
-            
-            # Auto-reload config if successful
-            if result.get('success'):
-                reload_categorizer()
-                result['config_reloaded'] = True
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, indent=2)
-            )]
-        
-        elif name == "migrate_category":
-            client = get_sheets_client()
-            categorizer = get_categorizer()
-            
-            old_category_id = arguments.get('old_category_id', '')
-            new_category_id = arguments.get('new_category_id', '')
-            
-            # Validate new category exists
-            if not categorizer.validate_category(new_category_id):
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': f"Target category '{new_category_id}' does not exist",
-                        'valid_categories': list(categorizer.category_ids),
-                        'suggestion': 'Update the Categories tab first, then reload config'
-                    })
-                )]
-            
-            result = client.migrate_category(
-                old_category_id=old_category_id,
-                new_category_id=new_category_id
-            )
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, indent=2)
-            )]
-        
-        elif name == "query_transactions":
-            client = get_sheets_client()
-            # Build filters from arguments
-            filter_keys = ['category', 'description_pattern', 'date_from', 'date_to',
-                           'source', 'needs_review', 'amount_min', 'amount_max',
-                           'uncategorized_only', 'account']
-            filters = {k: arguments[k] for k in filter_keys if k in arguments and arguments[k] is not None}
-            limit = arguments.get('limit', 50)
-            offset = arguments.get('offset', 0)
-
-            result = client.query_transactions(filters=filters, limit=limit, offset=offset)
-
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, indent=2)
-            )]
-
-        elif name == "bulk_update_category":
-            client = get_sheets_client()
-            categorizer = get_categorizer()
-
-            new_category_id = arguments.get('new_category_id', '')
-            dry_run = arguments.get('dry_run', True)
-
-            # Validate category
-            if not categorizer.validate_category(new_category_id):
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': f"Invalid category_id: {new_category_id}",
-                        'valid_categories': list(categorizer.category_ids)
-                    })
-                )]
-
-            # Build filters (require at least one)
-            filter_keys = ['category', 'description_pattern', 'date_from', 'date_to',
-                           'source', 'amount_min', 'amount_max', 'account']
-            filters = {k: arguments[k] for k in filter_keys if k in arguments and arguments[k] is not None}
-
-            if not filters:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': 'At least one filter is required to prevent accidental bulk updates',
-                        'available_filters': filter_keys
-                    })
-                )]
+@_tool_handler("audit_merchant_rules")
+async def _tool_audit_merchant_rules(arguments: dict[str, Any]) -> list[TextContent]:
+    categorizer = get_categorizer()
+    test_description = arguments.get('test_description', '')
+    rules = categorizer.merchant_rules
+    invalid_rules = categorizer.invalid_merchant_rules
 
-            result = client.bulk_update_category(
-                filters=filters,
-                new_category_id=new_category_id,
-                dry_run=dry_run
-            )
+    issues, matching_rules = await asyncio.to_thread(
+        _audit_rules, rules, invalid_rules, test_description
+    )
 
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, indent=2)
-            )]
-
-        elif name == "reset_categories":
-            client = get_sheets_client()
-            dry_run = arguments.get('dry_run', True)
-
-            # Build filters (require at least one)
-            filter_keys = ['category', 'description_pattern', 'source', 'date_from',
-                           'date_to', 'needs_review']
-            filters = {k: arguments[k] for k in filter_keys if k in arguments and arguments[k] is not None}
-
-            if not filters:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': 'At least one filter is required to prevent accidental mass reset',
-                        'available_filters': filter_keys
-                    })
-                )]
+    output = {
+        'total_rules': len(rules) + len(invalid_rules),
+        'issues_found': len(issues),
+        'issues': issues,
+        'rules_sorted_by': 'length (longest first for determinism)',
+    }
 
-            result = client.reset_categories(filters=filters, dry_run=dry_run)
+    if test_description:
+        output['test_description'] = test_description
+        output['matching_rules'] = matching_rules
+        output['first_match'] = matching_rules[0] if matching_rules else None
 
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, indent=2)
-            )]
+    return [TextContent(
+        type="text",
+        text=_dumps(output)
+    )]
 
-        elif name == "get_spending_summary":
-            client = get_sheets_client()
-            date_from = arguments.get('date_from')
-            date_to = arguments.get('date_to')
 
-            # Get category taxonomy for parent/budget mapping
-            categories = client.get_categories()
+@_tool_handler("add_merchant_rule")
+async def _tool_add_merchant_rule(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    categorizer = get_categorizer()
+    
+    merchant_pattern = arguments.get('merchant_pattern', '')
+    category_id = arguments.get('category_id', '')
+    confidence = arguments.get('confidence', 100)
+    notes = arguments.get('notes', '')
+    
+    # Validate category exists
+    if not categorizer.validate_category(category_id):
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': f"Invalid category_id: {category_id}",
+                'valid_categories': categorizer.category_id_list
+            })
+        )]
+    
+    result = client.add_merchant_rule(
+        merchant_pattern=merchant_pattern,
+        category_id=category_id,
+        confidence=confidence,
+        notes=notes
+    )
+    
+    # Apply the new rule to the cached categorizer if successful
+    if result.get('success'):
+        add_rules_to_categorizer([{
+            'merchant_pattern': result['merchant_pattern'],
+            'category_id': result['category_id'],
+            'confidence': result['confidence'],
+            'notes': result['notes'],
+        }])
+        result['categorizer_updated'] = True
+    
+    return [TextContent(
+        type="text",
+        text=_dumps(result)
+    )]
 
-            result = client.get_spending_summary(
-                date_from=date_from,
-                date_to=date_to,
-                category_taxonomy=categories
-            )
 
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, indent=2)
-            )]
+@_tool_handler("add_keyword")
+async def _tool_add_keyword(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    categorizer = get_categorizer()
+    
+    keyword = arguments.get('keyword', '')
+    category_id = arguments.get('category_id', '')
+    priority = arguments.get('priority', 20)
+    
+    # Validate category exists
+    if not categorizer.validate_category(category_id):
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': f"Invalid category_id: {category_id}",
+                'valid_categories': categorizer.category_id_list
+            })
+        )]
+    
+    result = client.add_keyword(
+        keyword=keyword,
+        category_id=category_id,
+        priority=priority
+    )
+    
+    # Auto-reload config if successful
+    if result.get('success'):
+        reload_categorizer()
+        result['config_reloaded'] = True
+    
+    return [TextContent(
+        type="text",
+        text=_dumps(result)
+    )]
 
-        elif name == "generate_dashboard":
-            from dashboard_generator import generate_dashboard_html
 
-            client = get_sheets_client()
-            date_from = arguments.get('date_from')
-            date_to = arguments.get('date_to')
+@_tool_handler("migrate_category")
+async def _tool_migrate_category(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    categorizer = get_categorizer()
+    
+    old_category_id = arguments.get('old_category_id', '')
+    new_category_id = arguments.get('new_category_id', '')
+    
+    # Validate new category exists
+    if not categorizer.validate_category(new_category_id):
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': f"Target category '{new_category_id}' does not exist",
+                'valid_categories': categorizer.category_id_list,
+                'suggestion': 'Update the Categories tab first, then reload config'
+            })
+        )]
+    
+    result = client.migrate_category(
+        old_category_id=old_category_id,
+        new_category_id=new_category_id
+    )
+    
+    return [TextContent(
+        type="text",
+        text=_dumps(result)
+    )]
 
-            # Get summary data
-            categories = client.get_categories()
-            summary = client.get_spending_summary(
-                date_from=date_from,
-                date_to=date_to,
-                category_taxonomy=categories
-            )
 
-            # Get all transactions for drill-down (high limit)
-            filters = {}
-            if date_from:
-                filters['date_from'] = date_from
-            if date_to:
-                filters['date_to'] = date_to
-            query_result = client.query_transactions(filters=filters, limit=10000, offset=0)
-            transactions = query_result.get('transactions', [])
-
-            # Generate HTML
-            output_path = generate_dashboard_html(summary, transactions)
-
-            return [TextContent(
-                type="text",
-                text=json.dumps({
-                    'success': True,
-                    'file': output_path,
-                    'period': summary.get('period', {}),
-                    'total_transactions': len(transactions),
-                    'total_income': summary.get('total_income', 0),
-                    'total_expenses': summary.get('total_expenses', 0),
-                    'net': summary.get('net', 0),
-                    'message': f'Dashboard saved to {output_path} — open in browser to view'
-                }, indent=2)
-            )]
-
-        elif name == "auto_categorize_batch":
-            client = get_sheets_client()
-            categorizer = get_categorizer()
-            categorizations = arguments.get('categorizations', [])
-            batch_size = arguments.get('batch_size', 50)
-
-            results = {
-                'written': 0,
-                'write_errors': [],
-                'rules_added': [],
-                'next_batch': [],
-                'stats': {},
-                'continue': False
-            }
+@_tool_handler("query_transactions")
+async def _tool_query_transactions(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    filters = _filters_from_arguments(arguments, _QUERY_FILTER_KEYS)
+    limit = arguments.get('limit', 50)
+    offset = arguments.get('offset', 0)
+
+    result = client.query_transactions(filters=filters, limit=limit, offset=offset)
+
+    return [TextContent(
+        type="text",
+        text=_dumps(result)
+    )]
+
+
+@_tool_handler("bulk_update_category")
+async def _tool_bulk_update_category(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    categorizer = get_categorizer()
+
+    new_category_id = arguments.get('new_category_id', '')
+    dry_run = arguments.get('dry_run', True)
 
-            # Step 1: Write previous categorizations if provided
-            if categorizations:
-                # Validate and prepare updates
-                updates = []
-                for cat in categorizations:
-                    row_num = cat.get('row_number')
-                    category_id = cat.get('category_id')
-                    confidence = cat.get('confidence', 80)
-
-                    if not row_num or not category_id:
-                        results['write_errors'].append({'error': 'Missing row_number or category_id', 'input': cat})
+    # Validate category
+    if not categorizer.validate_category(new_category_id):
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': f"Invalid category_id: {new_category_id}",
+                'valid_categories': categorizer.category_id_list
+            })
+        )]
+
+    # Build filters (require at least one)
+    filters = _filters_from_arguments(arguments, _BULK_UPDATE_FILTER_KEYS)
+
+    if not filters:
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': 'At least one filter is required to prevent accidental bulk updates',
+                'available_filters': list(_BULK_UPDATE_FILTER_KEYS)
+            })
+        )]
+
+    result = client.bulk_update_category(
+        filters=filters,
+        new_category_id=new_category_id,
+        dry_run=dry_run
+    )
+
+    return [TextContent(
+        type="text",
+        text=_dumps(result)
+    )]
+
+
+@_tool_handler("reset_categories")
+async def _tool_reset_categories(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    dry_run = arguments.get('dry_run', True)
+
+    # Build filters (require at least one)
+    filters = _filters_from_arguments(arguments, _RESET_FILTER_KEYS)
+
+    if not filters:
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': 'At least one filter is required to prevent accidental mass reset',
+                'available_filters': list(_RESET_FILTER_KEYS)
+            })
+        )]
+
+    result = client.reset_categories(filters=filters, dry_run=dry_run)
+
+    return [TextContent(
+        type="text",
+        text=_dumps(result)
+    )]
+
+
+@_tool_handler("get_spending_summary")
+async def _tool_get_spending_summary(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    date_from = arguments.get('date_from')
+    date_to = arguments.get('date_to')
+
+    # Get category taxonomy for parent/budget mapping
+    categories = client.get_categories()
+
+    result = client.get_spending_summary(
+        date_from=date_from,
+        date_to=date_to,
+        category_taxonomy=categories
+    )
+
+    return [TextContent(
+        type="text",
+        text=_dumps(result)
+    )]
+
+
+@_tool_handler("generate_dashboard")
+async def _tool_generate_dashboard(arguments: dict[str, Any]) -> list[TextContent]:
+    from dashboard_generator import generate_dashboard_html
+
+    client = get_sheets_client()
+    date_from = arguments.get('date_from')
+    date_to = arguments.get('date_to')
+
+    # Read the transactions sheet once for both the summary and the
+    # drill-down rows
+    rows = client.read_transaction_rows()
+
+    # Get summary data
+    categories = client.get_categories()
+    summary = client.get_spending_summary(
+        date_from=date_from,
+        date_to=date_to,
+        category_taxonomy=categories,
+        rows=rows
+    )
+
+    # Get all transactions for drill-down (high limit)
+    filters = {}
+    if date_from:
+        filters['date_from'] = date_from
+    if date_to:
+        filters['date_to'] = date_to
+    query_result = client.query_transactions(filters=filters, limit=10000, offset=0, rows=rows)
+    transactions = query_result.get('transactions', [])
+
+    # Generate HTML
+    output_path = generate_dashboard_html(summary, transactions)
+
+    return [TextContent(
+        type="text",
+        text=_dumps({
+            'success': True,
+            'file': output_path,
+            'period': summary.get('period', {}),
+            'total_transactions': len(transactions),
+            'total_income': summary.get('total_income', 0),
+            'total_expenses': summary.get('total_expenses', 0),
+            'net': summary.get('net', 0),
+            'message': f'Dashboard saved to {output_path} — open in browser to view'
+        })
+    )]
+
+
+# Progress stats for an auto_categorize_batch session. The full-sheet scan
+# runs on the first call and the final batch; calls in between adjust the
+# counts by the rows they wrote. Refreshed if older than the TTL.
+_PROGRESS_STATS_TTL = 600  # seconds
+_progress_stats = None
+_progress_stats_time = 0.0
+
+
+def _batch_progress(client, newly_categorized: int, final: bool) -> dict[str, Any]:
+    """Return total/categorized/remaining/percent_complete for auto_categorize_batch."""
+    global _progress_stats, _progress_stats_time
+
+    now = time.monotonic()
+    if final or _progress_stats is None or now - _progress_stats_time > _PROGRESS_STATS_TTL:
+        stats = client.get_categorization_stats()
+        progress = {
+            'total': stats.get('total', 0),
+            'categorized': stats.get('categorized', 0),
+            'remaining': stats.get('uncategorized', 0),
+            'percent_complete': stats.get('percent_complete', 0),
+        }
+        _progress_stats_time = now
+    else:
+        progress = dict(_progress_stats)
+        moved = min(newly_categorized, progress['remaining'])
+        progress['categorized'] += moved
+        progress['remaining'] -= moved
+        total = progress['total']
+        progress['percent_complete'] = round(progress['categorized'] / total * 100, 1) if total > 0 else 0
+
+    # The final batch ends the session; start the next one from a fresh scan
+    _progress_stats = None if final else progress
+    return progress
+
+
+@_tool_handler("auto_categorize_batch")
+async def _tool_auto_categorize_batch(arguments: dict[str, Any]) -> list[TextContent]:
+    client = get_sheets_client()
+    categorizer = get_categorizer()
+    categorizations = arguments.get('categorizations', [])
+    batch_size = arguments.get('batch_size', 50)
+
+    results = {
+        'written': 0,
+        'write_errors': [],
+        'rules_added': [],
+        'next_batch': [],
+        'stats': {},
+        'continue': False
+    }
+
+    # Step 1: Write previous categorizations if provided
+    if categorizations:
+        # Validate and prepare updates
+        updates = []
+        for cat in categorizations:
+            row_num = cat.get('row_number')
+            category_id = cat.get('category_id')
+            confidence = cat.get('confidence', 80)
+
+            if not row_num or not category_id:
+                results['write_errors'].append({'error': 'Missing row_number or category_id', 'input': cat})
+                continue
+
+            if not categorizer.validate_category(category_id):
+                results['write_errors'].append({'error': f'Invalid category: {category_id}', 'row': row_num})
+                continue
+
+            updates.append({
+                'row_number': row_num,
+                'category_id': category_id,
+                'source': 'claude',
+                'confidence': confidence,
+                'needs_review': True,  # Always flag Claude decisions for review
+                'review_reason': 'Auto-categorized by Claude'
+            })
+
+        if updates:
+            write_result = client.write_categories(updates)
+            results['written'] = write_result.get('success_count', 0)
+
+    # Step 2: Analyze patterns for rule learning
+    # Get recent Claude categorizations to find repeated patterns
+    try:
+        headers, col_indices = client._get_headers()
+        desc_idx = col_indices.get('Description', col_indices.get('description'))
+        cat_idx = col_indices.get('claude_category')
+        source_idx = col_indices.get('category_source')
+
+        if None not in (desc_idx, cat_idx, source_idx):
+            # Only these three columns are needed, so fetch just them
+            # rather than every column of every row, a page at a time
+            rows = client.iter_transaction_columns([desc_idx, cat_idx, source_idx])
+
+            # Patterns already covered by a rule (equal to, inside, or
+            # containing one) can never become new rules, so drop them
+            # before counting
+            existing_rules = categorizer.merchant_pattern_index()
+
+            def claude_patterns():
+                # category_source holds a handful of distinct values, so
+                # normalize each raw cell value once rather than per row
+                is_claude = {}
+                covered = {}  # pattern -> covered by an existing rule
+                for desc, category, source in rows:
+                    claude = is_claude.get(source)
+                    if claude is None:
+                        claude = is_claude[source] = source.strip().lower() == 'claude'
+                    if not claude:
                         continue
 
-                    if not categorizer.validate_category(category_id):
-                        results['write_errors'].append({'error': f'Invalid category: {category_id}', 'row': row_num})
+                    category = category.strip()
+                    if not category:
                         continue
 
-                    updates.append({
-                        'row_number': row_num,
-                        'category_id': category_id,
-                        'source': 'claude',
-                        'confidence': confidence,
-                        'needs_review': True,  # Always flag Claude decisions for review
-                        'review_reason': 'Auto-categorized by Claude'
+                    # Extract potential merchant pattern (first 2-3 words,
+                    # normalized); maxsplit stops after the words we keep
+                    pattern = ' '.join(desc.lower().split(None, 3)[:3])
+
+                    # Only consider patterns 4+ chars (drops blank descriptions too)
+                    if len(pattern) < 4:
+                        continue
+
+                    is_covered = covered.get(pattern)
+                    if is_covered is None:
+                        is_covered = covered[pattern] = existing_rules.covers(pattern)
+                    if not is_covered:
+                        yield pattern, category
+
+            # Count uncovered merchant patterns from Claude categorizations
+            pattern_counts = Counter(claude_patterns())  # (pattern, category_id) -> count
+
+            # Most common category for each pattern
+            new_rules = []
+            for pattern, (top_category, count) in top_category_by_pattern(pattern_counts).items():
+                # If 2+ occurrences (no existing rule covers it), create one
+                if count >= 2:
+                    new_rules.append({
+                        'merchant_pattern': pattern,
+                        'category_id': top_category,
+                        'confidence': 90,
+                        'notes': f"Auto-learned from {count} Claude categorizations",
+                        'occurrences': count
                     })
 
-                if updates:
-                    write_result = client.write_categories(updates)
-                    results['written'] = write_result.get('success_count', 0)
-
-            # Step 2: Analyze patterns for rule learning
-            # Get recent Claude categorizations to find repeated patterns
-            try:
-                service = client._get_service()
-                all_data = service.spreadsheets().values().get(
-                    spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
-                    range=f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!A:Z"
-                ).execute()
-
-                headers, col_indices = client._get_headers()
-                values = all_data.get('values', [])
-
-                if len(values) > 1:
-                    desc_idx = col_indices.get('Description', col_indices.get('description'))
-                    cat_idx = col_indices.get('claude_category')
-                    source_idx = col_indices.get('category_source')
-
-                    # Count merchant patterns from Claude categorizations
-                    pattern_counts = {}  # pattern -> {category_id: count}
-
-                    for row in values[1:]:
-                        if len(row) <= max(desc_idx or 0, cat_idx or 0, source_idx or 0):
-                            continue
-
-                        source = row[source_idx].strip().lower() if source_idx and source_idx < len(row) else ''
-                        if source != 'claude':
-                            continue
-
-                        desc = row[desc_idx].strip().lower() if desc_idx and desc_idx < len(row) else ''
-                        category = row[cat_idx].strip() if cat_idx and cat_idx < len(row) else ''
-
-                        if not desc or not category:
-                            continue
-
-                        # Extract potential merchant pattern (first 2-3 words, normalized)
-                        words = desc.split()[:3]
-                        pattern = ' '.join(words)
-
-                        # Only consider patterns 4+ chars
-                        if len(pattern) < 4:
-                            continue
-
-                        if pattern not in pattern_counts:
-                            pattern_counts[pattern] = {}
-                        pattern_counts[pattern][category] = pattern_counts[pattern].get(category, 0) + 1
-
-                    # Find patterns that appear 2+ times with same category and don't have rules yet
-                    existing_rules = {r['merchant_pattern'] for r in categorizer.merchant_rules}
-
-                    for pattern, cat_counts in pattern_counts.items():
-                        # Get the most common category for this pattern
-                        top_category = max(cat_counts, key=cat_counts.get)
-                        count = cat_counts[top_category]
-
-                        # If 2+ occurrences and no existing rule, create one
-                        if count >= 2 and pattern not in existing_rules:
-                            # Check if pattern is substring of existing rule
-                            is_covered = any(pattern in r or r in pattern for r in existing_rules)
-                            if not is_covered:
-                                add_result = client.add_merchant_rule(
-                                    merchant_pattern=pattern,
-                                    category_id=top_category,
-                                    confidence=90,
-                                    notes=f"Auto-learned from {count} Claude categorizations"
-                                )
-                                if add_result.get('success'):
-                                    results['rules_added'].append({
-                                        'pattern': pattern,
-                                        'category': top_category,
-                                        'occurrences': count
-                                    })
-
-                    # Reload categorizer if rules were added
-                    if results['rules_added']:
-                        reload_categorizer()
-
-            except Exception as e:
-                logger.warning(f"Error in pattern learning: {e}")
-
-            # Step 3: Get next batch of uncategorized
-            transactions = client.get_uncategorized_transactions(limit=batch_size, offset=0)
-
-            # Apply rules first
-            if transactions:
-                batch_results = categorizer.categorize_batch(transactions)
-
-                # Auto-write rule matches
-                auto_updates = []
-                for t in batch_results['auto_categorized']:
-                    cat_info = t['_categorization']
-                    auto_updates.append({
-                        'row_number': t.get('_row_number'),
-                        'category_id': cat_info['category_id'],
-                        'source': cat_info['source'],
-                        'confidence': cat_info['confidence'],
-                        'needs_review': cat_info.get('needs_review', False),
-                        'review_reason': cat_info.get('review_reason', '')
+            # Write all learned rules in one append
+            if new_rules:
+                add_result = client.add_merchant_rules(new_rules)
+                occurrences = {r['merchant_pattern']: r['occurrences'] for r in new_rules}
+                for rule in add_result.get('added', []):
+                    results['rules_added'].append({
+                        'pattern': rule['merchant_pattern'],
+                        'category': rule['category_id'],
+                        'occurrences': occurrences[rule['merchant_pattern']]
                     })
 
-                if auto_updates:
-                    client.write_categories(auto_updates)
-                    results['auto_categorized'] = len(auto_updates)
-
-                # Return needs_claude for Claude to categorize
-                results['next_batch'] = [
-                    {
-                        'row_number': t.get('_row_number'),
-                        'Date': t.get('Date', ''),
-                        'Description': t.get('Description', ''),
-                        'Amount': t.get('Amount', ''),
-                        'Account': t.get('Account', ''),
-                        'hint': t['_categorization'].get('review_reason', '')
-                    }
-                    for t in batch_results['needs_claude']
-                ]
-
-            # Step 4: Get stats
-            stats = client.get_categorization_stats()
-            results['stats'] = {
-                'total': stats.get('total', 0),
-                'categorized': stats.get('categorized', 0),
-                'remaining': stats.get('uncategorized', 0),
-                'percent_complete': stats.get('percent_complete', 0),
+                # Use the new rules for this batch without re-reading config
+                if add_result.get('added'):
+                    categorizer = add_rules_to_categorizer(add_result['added'])
+
+    except Exception as e:
+        logger.warning(f"Error in pattern learning: {e}")
+
+    # Step 3: Get next batch of uncategorized
+    transactions = client.get_uncategorized_transactions(limit=batch_size, offset=0)
+
+    # Apply rules first
+    if transactions:
+        batch_results = categorizer.categorize_batch(transactions)
+
+        # Auto-write rule matches
+        auto_updates = [_rule_update(t) for t in batch_results['auto_categorized']]
+
+        if auto_updates:
+            client.write_categories(auto_updates)
+            results['auto_categorized'] = len(auto_updates)
+
+        # Return needs_claude for Claude to categorize
+        results['next_batch'] = [
+            {
+                'row_number': t.get('_row_number'),
+                'Date': t.get('Date', ''),
+                'Description': t.get('Description', ''),
+                'Amount': t.get('Amount', ''),
+                'Account': t.get('Account', ''),
+                'hint': t['_categorization'].review_reason or ''
             }
+            for t in batch_results['needs_claude']
+        ]
+
+    # Step 4: Get stats (a real sheet scan only on the first and final batch)
+    results['stats'] = _batch_progress(
+        client,
+        newly_categorized=results['written'] + results.get('auto_categorized', 0),
+        final=not results['next_batch']
+    )
+
+    # Step 5: Determine if should continue
+    results['continue'] = len(results['next_batch']) > 0
+
+    # Add guidance message
+    if results['continue']:
+        results['message'] = f"Categorize the {len(results['next_batch'])} transactions in next_batch, then call this tool again with your categorizations."
+    else:
+        results['message'] = "All transactions categorized! No more batches to process."
+
+    return [TextContent(
+        type="text",
+        text=_dumps(results)
+    )]
+
+
+@_tool_handler("bulk_categorize_api")
+async def _tool_bulk_categorize_api(arguments: dict[str, Any]) -> list[TextContent]:
+    # Run bulk_categorizer in-process so the warm categorizer is reused and
+    # no interpreter, Google client or OAuth startup is paid per call
+
+    max_batches = arguments.get('max_transactions', 1000) // arguments.get('batch_size', 100)
+    batch_size = arguments.get('batch_size', 100)
+    dry_run = arguments.get('dry_run', False)
+    learn_rules = arguments.get('learn_rules', True)
+    filter_parent = arguments.get('filter_parent')
+
+    # The first lookup may shell out to the Keychain; keep it off the loop
+    api_key = await asyncio.to_thread(get_anthropic_api_key)
+    if not api_key:
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': 'No Anthropic API key found. Set ANTHROPIC_API_KEY env var or store in macOS Keychain (see KEYCHAIN_SERVICE_NAME env var).'
+            })
+        )]
 
-            # Step 5: Determine if should continue
-            results['continue'] = len(results['next_batch']) > 0
-
-            # Add guidance message
-            if results['continue']:
-                results['message'] = f"Categorize the {len(results['next_batch'])} transactions in next_batch, then call this tool again with your categorizations."
-            else:
-                results['message'] = "All transactions categorized! No more batches to process."
-
-            return [TextContent(
-                type="text",
-                text=json.dumps(results, indent=2)
-            )]
-
-        elif name == "bulk_categorize_api":
-            # Run the external bulk_categorize.py script
-            # This ensures we use the same code with pagination fixes
-
-            max_batches = arguments.get('max_transactions', 1000) // arguments.get('batch_size', 100)
-            batch_size = arguments.get('batch_size', 100)
-            dry_run = arguments.get('dry_run', False)
-            learn_rules = arguments.get('learn_rules', True)
-            filter_parent = arguments.get('filter_parent')
-
-            script_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'bulk_categorizer',
-                'bulk_categorize.py'
-            )
+    global _bulk_run
+    if _bulk_run is not None and not _bulk_run[0].done():
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': 'A previous bulk categorization run is still in progress'
+                         + (' (stopping after its current batch)' if _bulk_run[1].is_set() else ''),
+                'suggestion': 'Wait for it to finish, then check get_categorization_stats'
+            })
+        )]
+
+    logger.info(f"Running bulk categorizer: batch_size={batch_size}, max_batches={max_batches}")
 
-            # Use the venv Python (script has shebang but be explicit)
-            venv_python = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'venv', 'bin', 'python'
+    try:
+        if _BULK_CATEGORIZER_DIR not in sys.path:
+            sys.path.insert(0, _BULK_CATEGORIZER_DIR)
+        from bulk_categorize import run as run_bulk_categorize
+
+        # Load the categorizer here, on the event loop thread, since it reads
+        # through the shared Sheets client. The run itself uses its own
+        # SheetsClient, so it is safe in a worker thread.
+        categorizer = get_categorizer()
+        stop_event = threading.Event()
+        task = asyncio.ensure_future(asyncio.to_thread(
+            run_bulk_categorize,
+            batch_size=batch_size,
+            max_batches=max_batches,
+            dry_run=dry_run,
+            learn_rules=learn_rules,
+            filter_parent=filter_parent,
+            api_key=api_key,
+            categorizer=categorizer,
+            stop_event=stop_event
+        ))
+        _bulk_run = (task, stop_event)
+
+        # A worker thread can't be killed, so on timeout (or if this call is
+        # cancelled) ask the run to stop before its next batch and let it
+        # finish in the background; new runs are refused until it has
+        try:
+            stats = await asyncio.wait_for(
+                asyncio.shield(task),
+                timeout=1800  # 30 minute timeout for large batches
             )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            stop_event.set()
+            task.add_done_callback(_reload_after_bulk_run)
+            raise
+    except asyncio.TimeoutError:
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': 'Bulk categorization timed out after 30 minutes; '
+                         'the run will stop after its current batch',
+                'suggestion': 'Try with smaller max_transactions'
+            })
+        )]
+    except Exception as e:
+        logger.exception("Bulk categorization failed")
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': str(e)
+            })
+        )]
+    finally:
+        # The run writes through its own client, even when it fails part way
+        invalidate_transaction_caches()
+
+    # Pick up any merchant rules the run learned
+    if stats.get('rules_learned'):
+        reload_categorizer()
+
+    output = {
+        'success': True,
+        'dry_run': dry_run,
+        'stats': stats,
+        'message': f"Processed {stats.get('total_processed', 0)} transactions: {stats.get('rule_categorized', 0)} by rules, {stats.get('claude_categorized', 0)} by Claude API. Cost: ${stats.get('api_usage', {}).get('estimated_cost_usd', 0):.2f}",
+    }
+
+    return [TextContent(
+        type="text",
+        text=_dumps(output)
+    )]
+
+
+def _reload_after_bulk_run(task: asyncio.Future) -> None:
+    """Done callback for a timed-out bulk run: pick up what it wrote."""
+    invalidate_transaction_caches()
+    if task.cancelled() or task.exception() is not None:
+        return
+    stats = task.result()
+    logger.info(f"Timed-out bulk categorization finished: {stats.get('total_processed', 0)} processed")
+    if stats.get('rules_learned'):
+        reload_categorizer()
+
+
+async def _run_script(
+    cmd: list[str],
+    cwd: str,
+    timeout: float,
+    env: Optional[dict[str, str]] = None,
+    stdout_tail: int = 5000,
+    stderr_tail: int = 2000,
+) -> tuple[int, str, str]:
+    """
+    Run a helper script without blocking the event loop.
 
-            cmd = [venv_python, script_path]
-            cmd.extend(['--batch-size', str(batch_size)])
-            cmd.extend(['--max-batches', str(max_batches)])
-
-            if dry_run:
-                cmd.append('--dry-run')
-            if not learn_rules:
-                cmd.append('--no-learn-rules')
-            if filter_parent:
-                cmd.extend(['--filter-parent', filter_parent])
-
-            # Ensure API key is available in subprocess env
-            env = os.environ.copy()
-            if 'ANTHROPIC_API_KEY' not in env:
-                api_key = get_anthropic_api_key()
-                if api_key:
-                    env['ANTHROPIC_API_KEY'] = api_key
-                else:
-                    return [TextContent(
-                        type="text",
-                        text=json.dumps({
-                            'success': False,
-                            'error': 'No Anthropic API key found. Set ANTHROPIC_API_KEY env var or store in macOS Keychain (see KEYCHAIN_SERVICE_NAME env var).'
-                        })
-                    )]
-
-            logger.info(f"Running bulk categorizer: {' '.join(cmd)}")
-
-            try:
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=1800,  # 30 minute timeout for large batches
-                    cwd=os.path.dirname(script_path),
-                    env=env
-                )
-
-                # Try to read the stats file for structured output
-                stats_file = os.path.join(os.path.dirname(script_path), 'last_run_stats.json')
-                stats = {}
-                if os.path.exists(stats_file):
-                    try:
-                        with open(stats_file, 'r') as f:
-                            stats = json.load(f)
-                    except Exception:
-                        pass
-
-                output = {
-                    'success': result.returncode == 0,
-                    'dry_run': dry_run,
-                    'stats': stats,
-                    'stdout': result.stdout[-3000:] if len(result.stdout) > 3000 else result.stdout,
-                    'stderr': result.stderr[-1000:] if len(result.stderr) > 1000 else result.stderr,
-                }
+    Output is drained as it arrives and only the last stdout_tail /
+    stderr_tail characters are kept, so a long run doesn't buffer its whole
+    log. Raises subprocess.TimeoutExpired (after killing the process) if
+    the script runs longer than timeout seconds. The scripts write to the
+    sheets directly, so the shared client's caches are dropped afterwards.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=env
+    )
+
+    async def read_tail(stream, size: int) -> str:
+        # Keep a few bytes per character of slack for multi-byte UTF-8
+        keep = size * 4
+        buf = bytearray()
+        while chunk := await stream.read(65536):
+            buf += chunk
+            if len(buf) > keep:
+                del buf[:-keep]
+        return buf.decode('utf-8', errors='replace')[-size:]
 
-                if result.returncode != 0:
-                    output['error'] = f"Script exited with code {result.returncode}"
-                elif stats:
-                    output['message'] = f"Processed {stats.get('total_processed', 0)} transactions: {stats.get('rule_categorized', 0)} by rules, {stats.get('claude_categorized', 0)} by Claude API. Cost: ${stats.get('api_usage', {}).get('estimated_cost_usd', 0):.2f}"
-
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(output, indent=2)
-                )]
-
-            except subprocess.TimeoutExpired:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': 'Bulk categorization timed out after 30 minutes',
-                        'suggestion': 'Try with smaller max_transactions'
-                    })
-                )]
-            except Exception as e:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': str(e)
-                    })
-                )]
-
-        elif name == "run_email_backfill":
-            mode = arguments.get('mode', 'optimized_incremental')
-            limit = arguments.get('limit')
-            start_date = arguments.get('start_date')
-            end_date = arguments.get('end_date')
-            email_type = arguments.get('email_type', 'all')
-            dry_run = arguments.get('dry_run', False)
-
-            script_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'backfill_emails.py'
-            )
-            
-            cmd = [sys.executable, script_path]
-
-            # Mode flags (these bypass the interactive prompt)
-            if mode == 'optimized_incremental':
-                cmd.extend(['--optimized', '--incremental'])
-            elif mode == 'optimized':
-                cmd.append('--optimized')
-            # Legacy mode = no flags
-            
-            # Optional parameters
-            if limit:
-                cmd.extend(['--limit', str(limit)])
-            if start_date:
-                cmd.extend(['--start-date', start_date])
-            if end_date:
-                cmd.extend(['--end-date', end_date])
-            if dry_run:
-                cmd.append('--dry-run')
-            
-            # Email type filters
-            if email_type == 'orders':
-                cmd.append('--orders-only')
-            elif email_type == 'shipments':
-                cmd.append('--shipments-only')
-            elif email_type == 'returns':
-                cmd.append('--returns-only')
-            
-            logger.info(f"Running backfill: {' '.join(cmd)}")
-            
-            try:
-                # Run the script and capture output
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=600,  # 10 minute timeout
-                    cwd=os.path.dirname(script_path)
-                )
-                
-                output = {
-                    'success': result.returncode == 0,
-                    'mode': mode,
-                    'command': ' '.join(cmd),
-                    'stdout': result.stdout[-5000:] if len(result.stdout) > 5000 else result.stdout,  # Last 5KB
-                    'stderr': result.stderr[-2000:] if len(result.stderr) > 2000 else result.stderr,
-                }
-                
-                if result.returncode != 0:
-                    output['error'] = f"Script exited with code {result.returncode}"
-                
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(output, indent=2)
-                )]
-                
-            except subprocess.TimeoutExpired:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': 'Backfill timed out after 10 minutes',
-                        'mode': mode,
-                        'suggestion': 'Try running with --limit to process fewer emails'
-                    })
-                )]
-            except Exception as e:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': str(e),
-                        'mode': mode
-                    })
-                )]
+    try:
+        stdout, stderr, _ = await asyncio.wait_for(
+            asyncio.gather(
+                read_tail(proc.stdout, stdout_tail),
+                read_tail(proc.stderr, stderr_tail),
+                proc.wait()
+            ),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    finally:
+        invalidate_transaction_caches()
+
+    return proc.returncode, stdout, stderr
+
+
+@_tool_handler("run_email_backfill")
+async def _tool_run_email_backfill(arguments: dict[str, Any]) -> list[TextContent]:
+    mode = arguments.get('mode', 'optimized_incremental')
+    limit = arguments.get('limit')
+    start_date = arguments.get('start_date')
+    end_date = arguments.get('end_date')
+    email_type = arguments.get('email_type', 'all')
+    dry_run = arguments.get('dry_run', False)
+
+    script_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'backfill_emails.py'
+    )
+    
+    cmd = [sys.executable, script_path]
+
+    # Mode flags (these bypass the interactive prompt)
+    if mode == 'optimized_incremental':
+        cmd.extend(['--optimized', '--incremental'])
+    elif mode == 'optimized':
+        cmd.append('--optimized')
+    # Legacy mode = no flags
+    
+    # Optional parameters
+    if limit:
+        cmd.extend(['--limit', str(limit)])
+    if start_date:
+        cmd.extend(['--start-date', start_date])
+    if end_date:
+        cmd.extend(['--end-date', end_date])
+    if dry_run:
+        cmd.append('--dry-run')
+    
+    # Email type filters
+    if email_type == 'orders':
+        cmd.append('--orders-only')
+    elif email_type == 'shipments':
+        cmd.append('--shipments-only')
+    elif email_type == 'returns':
+        cmd.append('--returns-only')
+    
+    logger.info(f"Running backfill: {' '.join(cmd)}")
+    
+    try:
+        # Run the script, keeping the last 5KB of stdout / 2KB of stderr
+        returncode, stdout, stderr = await _run_script(
+            cmd,
+            cwd=os.path.dirname(script_path),
+            timeout=600  # 10 minute timeout
+        )
         
-        elif name == "run_transaction_matcher":
-            mode = arguments.get('mode', 'production')
-            
-            # Build command
-            script_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'transaction_matcher.py'
-            )
-            
-            cmd = [sys.executable, script_path]
-
-            # Set environment variable to bypass interactive prompt
-            env = os.environ.copy()
-            if mode == 'development':
-                env['DEV_MODE'] = 'true'
-            else:
-                env['DEV_MODE'] = 'false'
-            
-            logger.info(f"Running transaction matcher in {mode} mode")
-            
-            try:
-                # Run the script and capture output
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=600,  # 10 minute timeout
-                    cwd=os.path.dirname(script_path),
-                    env=env
-                )
-                
-                output = {
-                    'success': result.returncode == 0,
-                    'mode': mode,
-                    'stdout': result.stdout[-5000:] if len(result.stdout) > 5000 else result.stdout,
-                    'stderr': result.stderr[-2000:] if len(result.stderr) > 2000 else result.stderr,
-                }
-                
-                if result.returncode != 0:
-                    output['error'] = f"Script exited with code {result.returncode}"
-                
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(output, indent=2)
-                )]
-                
-            except subprocess.TimeoutExpired:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': 'Transaction matcher timed out after 10 minutes',
-                        'mode': mode
-                    })
-                )]
-            except Exception as e:
-                return [TextContent(
-                    type="text",
-                    text=json.dumps({
-                        'success': False,
-                        'error': str(e),
-                        'mode': mode
-                    })
-                )]
+        output = {
+            'success': returncode == 0,
+            'mode': mode,
+            'command': ' '.join(cmd),
+            'stdout': stdout,
+            'stderr': stderr,
+        }
         
-        else:
-            return [TextContent(
-                type="text",
-                text=json.dumps({'error': f'Unknown tool: {name}'})
-            )]
-            
+        if returncode != 0:
+            output['error'] = f"Script exited with code {returncode}"
+        
+        return [TextContent(
+            type="text",
+            text=_dumps(output)
+        )]
+        
+    except subprocess.TimeoutExpired:
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': 'Backfill timed out after 10 minutes',
+                'mode': mode,
+                'suggestion': 'Try running with --limit to process fewer emails'
+            })
+        )]
+    except Exception as e:
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': str(e),
+                'mode': mode
+            })
+        )]
+
+
+@_tool_handler("run_transaction_matcher")
+async def _tool_run_transaction_matcher(arguments: dict[str, Any]) -> list[TextContent]:
+    mode = arguments.get('mode', 'production')
+    
+    # Build command
+    script_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'transaction_matcher.py'
+    )
+    
+    cmd = [sys.executable, script_path]
+
+    # Set environment variable to bypass interactive prompt
+    env = os.environ.copy()
+    if mode == 'development':
+        env['DEV_MODE'] = 'true'
+    else:
+        env['DEV_MODE'] = 'false'
+    
+    logger.info(f"Running transaction matcher in {mode} mode")
+    
+    try:
+        # Run the script, keeping the last 5KB of stdout / 2KB of stderr
+        returncode, stdout, stderr = await _run_script(
+            cmd,
+            cwd=os.path.dirname(script_path),
+            timeout=600,  # 10 minute timeout
+            env=env
+        )
+        
+        output = {
+            'success': returncode == 0,
+            'mode': mode,
+            'stdout': stdout,
+            'stderr': stderr,
+        }
+        
+        if returncode != 0:
+            output['error'] = f"Script exited with code {returncode}"
+        
+        return [TextContent(
+            type="text",
+            text=_dumps(output)
+        )]
+        
+    except subprocess.TimeoutExpired:
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': 'Transaction matcher timed out after 10 minutes',
+                'mode': mode
+            })
+        )]
+    except Exception as e:
+        return [TextContent(
+            type="text",
+            text=_dumps({
+                'success': False,
+                'error': str(e),
+                'mode': mode
+            })
+        )]
+
+
+@server.call_tool()
+async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
+    """Handle tool calls."""
+    handler = _TOOL_HANDLERS.get(name)
+    if handler is None:
+        return [TextContent(
+            type="text",
+            text=_dumps({'error': f'Unknown tool: {name}'})
+        )]
+
+    try:
+        return await handler(arguments)
     except Exception as e:
         logger.exception(f"Error in tool {name}")
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=_dumps({
                 'error': str(e),
                 'tool': name,
                 'arguments': arguments
@@ -1944,6 +2220,8 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
 
 async def main():
     """Run the MCP server."""
+    from mcp.server.stdio import stdio_server
+
     validate_config()
     logger.info(f"Starting {MCP_SERVER_NAME} v{MCP_SERVER_VERSION}")
 
@@ -1956,5 +2234,4 @@ async def main():
 
 
 if __name__ == '__main__':
-    import asyncio
     asyncio.run(main())
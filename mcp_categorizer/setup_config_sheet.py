@@ -26,7 +26,7 @@ logger = logging.getLogger(__name__)
 # DEFAULT CATEGORIES
 # ============================================================================
 
-DEFAULT_CATEGORIES = [
+DEFAULT_CATEGORIES = (
     # Food & Dining
     ('groceries', 'Groceries', 'Food & Dining', 'Supermarkets, grocery stores'),
     ('restaurants', 'Restaurants', 'Food & Dining', 'Dining out, takeout, delivery'),
@@ -93,13 +93,13 @@ DEFAULT_CATEGORIES = [
     ('subscriptions', 'Subscriptions', 'Other', 'Recurring subscriptions'),
     ('charity', 'Charity & Donations', 'Other', 'Charitable donations'),
     ('uncategorized', 'Uncategorized', 'Other', 'Needs manual categorization'),
-]
+)
 
 # ============================================================================
 # DEFAULT MERCHANT RULES
 # ============================================================================
 
-DEFAULT_MERCHANT_RULES = [
+DEFAULT_MERCHANT_RULES = (
     # Groceries (100% confidence)
     ('whole foods', 'groceries', 100, 'Always groceries'),
     ('trader joe', 'groceries', 100, 'Always groceries'),
@@ -180,13 +180,13 @@ DEFAULT_MERCHANT_RULES = [
     # Refunds
     ('refund', 'refund', 90, 'Usually a refund'),
     ('return', 'refund', 80, 'Usually a return'),
-]
+)
 
 # ============================================================================
 # DEFAULT KEYWORDS
 # ============================================================================
 
-DEFAULT_KEYWORDS = [
+DEFAULT_KEYWORDS = (
     # Electronics
     ('battery', 'electronics', 20),
     ('charger', 'electronics', 20),
@@ -230,7 +230,7 @@ DEFAULT_KEYWORDS = [
     ('toy', 'kids', 15),
     ('diaper', 'kids', 25),
     ('baby', 'kids', 15),
-]
+)
 
 
 def create_config_sheet():
@@ -258,44 +258,42 @@ def create_config_sheet():
     
     logger.info(f"Created sheet: {sheet_url}")
     
-    # Populate Categories tab
-    logger.info("Populating Categories...")
     categories_data = [
         ['category_id', 'category_name', 'parent_category', 'description']
     ] + [list(c) for c in DEFAULT_CATEGORIES]
     
-    service.spreadsheets().values().update(
-        spreadsheetId=sheet_id,
-        range="'Categories'!A1",
-        valueInputOption='RAW',
-        body={'values': categories_data}
-    ).execute()
-    
-    # Populate Merchant Rules tab
-    logger.info("Populating Merchant Rules...")
     rules_data = [
         ['merchant_pattern', 'category_id', 'confidence', 'notes']
     ] + [list(r) for r in DEFAULT_MERCHANT_RULES]
     
-    service.spreadsheets().values().update(
-        spreadsheetId=sheet_id,
-        range="'Merchant Rules'!A1",
-        valueInputOption='RAW',
-        body={'values': rules_data}
-    ).execute()
-    
-    # Populate Keywords tab
-    logger.info("Populating Keywords...")
     keywords_data = [
         ['keyword', 'category_id', 'priority']
     ] + [list(k) for k in DEFAULT_KEYWORDS]
     
-    service.spreadsheets().values().update(
-        spreadsheetId=sheet_id,
-        range="'Keywords'!A1",
-        valueInputOption='RAW',
-        body={'values': keywords_data}
-    ).execute()
+    data = [
+        {'range': "'Categories'!A1", 'values': categories_data},
+        {'range': "'Merchant Rules'!A1", 'values': rules_data},
+        {'range': "'Keywords'!A1", 'values': keywords_data},
+    ]
+    
+    # Write all tabs in a single request; it succeeds or fails as a whole
+    logger.info(f"Writing {len(data)} tabs...")
+    try:
+        service.spreadsheets().values().batchUpdate(
+            spreadsheetId=sheet_id,
+            body={
+                'valueInputOption': 'RAW',
+                'data': data
+            }
+        ).execute()
+    except Exception as e:
+        failed = ', '.join(d['range'] for d in data)
+        logger.error(f"Failed to write {failed} to {sheet_url}: {e}")
+        raise
+    logger.info(
+        f"Wrote {len(categories_data) - 1} categories, {len(rules_data) - 1} "
+        f"merchant rules and {len(keywords_data) - 1} keywords"
+    )
     
     logger.info("")
     logger.info("=" * 60)
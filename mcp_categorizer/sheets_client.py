@@ -8,9 +8,12 @@ Wraps the existing utils.py authentication and adds categorization-specific oper
 import sys
 import os
 import logging
+import re
 import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+from itertools import islice, repeat, zip_longest
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 # Add parent directory to path to import utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,6 +22,7 @@ from utils import (
     get_credentials_oauth,
     get_sheets_service,
     column_index_to_letter,
+    _retry_on_error,
 )
 
 from config import (
@@ -45,20 +49,68 @@ from config import (
 
 logger = logging.getLogger(__name__)
 
+# Currency symbol and thousands separators, stripped before float()
+_MONEY_CHARS = str.maketrans('', '', '$,')
+
+_ISO_DATE_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+
+@lru_cache(maxsize=4096)
+def _parse_sheet_date(date_str: str) -> Optional[datetime]:
+    """
+    Parse a sheet date in YYYY-MM-DD, M/D/YYYY or M/D/YY form.
+
+    Cached because many rows share a date. Zero-padded ISO dates skip
+    strptime via fromisoformat.
+    """
+    s = date_str.strip()
+    if _ISO_DATE_RE.fullmatch(s):
+        try:
+            return datetime.fromisoformat(s)
+        except ValueError:
+            return None
+    for fmt in ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y'):
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+    return None
+
 
 class SheetsClient:
     """Client for all Google Sheets operations."""
 
     HEADERS_CACHE_TTL = 300  # 5 minutes
-
-    def __init__(self):
+    CATEGORIES_CACHE_TTL = 60  # 1 minute
+    COLUMN_PAGE_SIZE = 5000  # rows per page in iter_transaction_columns
+    ROW_PAGE_SIZE = 2000  # rows per page in iter_uncategorized_transactions
+    UNCATEGORIZED_INDEX_TTL = 120  # seconds
+    ROWS_CACHE_TTL = 30  # seconds; read_transaction_rows() for reports
+    WRITES_PER_MINUTE = 60  # Sheets' default per-user write quota
+    WRITE_BURST = 10  # writes allowed back-to-back before pacing kicks in
+
+    def __init__(self, pace_writes: bool = False):
+        """
+        Args:
+            pace_writes: Throttle writes to the quota by sleeping (see
+                _execute_write). Only for clients used off the event loop,
+                e.g. the bulk run's; the server's client must never sleep.
+        """
+        self._pace_writes = pace_writes
         self._creds = None
         self._service = None
         self._headers_cache = {}
         self._headers_cache_time = {}
         self._merchant_rules_cache = None
         self._categories_cache = None
+        self._categories_cache_time = 0
         self._columns_verified = False  # Track if categorization columns exist
+        self._uncategorized_rows = None  # Row numbers still to categorize
+        self._uncategorized_rows_time = 0
+        self._rows_cache = None  # (values, headers, col_indices) for reports
+        self._rows_cache_time = 0
+        self._write_tokens = self.WRITE_BURST
+        self._write_tokens_time = time.monotonic()
     
     def _get_service(self):
         """Get authenticated Sheets service (lazy initialization)."""
@@ -75,18 +127,53 @@ class SheetsClient:
             self._service = get_sheets_service(self._creds)
         return self._service
     
+    def _execute_write(self, request, idempotent: bool = True):
+        """
+        Execute a Sheets write request, paced and retried.
+        
+        With pace_writes, writes draw from a token bucket holding WRITE_BURST
+        tokens that refills at WRITES_PER_MINUTE, so bulk flows sleep briefly
+        instead of hitting the write quota; 429/5xx responses still back off
+        through _retry_on_error. Pass idempotent=False for appends: they are
+        only retried on 429, since a 5xx may arrive after the rows were added.
+        """
+        if self._pace_writes:
+            now = time.monotonic()
+            refill = (now - self._write_tokens_time) * self.WRITES_PER_MINUTE / 60
+            self._write_tokens = min(self.WRITE_BURST, self._write_tokens + refill)
+            self._write_tokens_time = now
+            if self._write_tokens < 1:
+                time.sleep((1 - self._write_tokens) * 60 / self.WRITES_PER_MINUTE)
+                self._write_tokens = 1
+                self._write_tokens_time = time.monotonic()
+            self._write_tokens -= 1
+        
+        # Any write may change what the cached report rows would show
+        self._rows_cache = None
+        return _retry_on_error(request.execute, rate_limits_only=not idempotent)
+    
     # ========================================================================
     # CONFIG SHEET OPERATIONS
     # ========================================================================
     
-    def get_categories(self) -> List[Dict[str, Any]]:
+    def get_categories(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
         """
         Get all categories from config sheet.
-        
+
+        Results are cached for CATEGORIES_CACHE_TTL seconds so back-to-back
+        tool calls share one read.
+
+        Args:
+            force_refresh: If True, bypass the cache and re-read the sheet
+
         Returns:
             List of category dicts with keys: category_id, category_name, 
             parent_category, description
         """
+        cache_age = time.time() - self._categories_cache_time
+        if not force_refresh and self._categories_cache is not None and cache_age < self.CATEGORIES_CACHE_TTL:
+            return self._categories_cache
+
         service = self._get_service()
         
         try:
@@ -105,24 +192,22 @@ class SheetsClient:
 
             # Build header index map for flexible column ordering
             header_map = {h.strip().lower(): i for i, h in enumerate(headers)}
+            cat_id_idx = header_map.get('category_id', 0)
+            cat_name_idx = header_map.get('category_name', 2)
+            parent_idx = header_map.get('parent_category', 1)
+            desc_idx = header_map.get('description', 3)
+            budget_idx = header_map.get('monthly_budget')
 
             for row in values[1:]:
                 if not row or not row[0]:
                     continue
 
-                padded_row = row + [''] * (len(headers) - len(row))
-
-                # Get values by header name (flexible ordering)
-                cat_id_idx = header_map.get('category_id', 0)
-                cat_name_idx = header_map.get('category_name', 2)
-                parent_idx = header_map.get('parent_category', 1)
-                desc_idx = header_map.get('description', 3)
-                budget_idx = header_map.get('monthly_budget')
+                n = len(row)
 
                 # Parse monthly_budget as float
                 monthly_budget = None
-                if budget_idx is not None and budget_idx < len(padded_row):
-                    budget_str = padded_row[budget_idx].strip().replace('$', '').replace(',', '')
+                if budget_idx is not None and budget_idx < n:
+                    budget_str = row[budget_idx].strip().translate(_MONEY_CHARS)
                     if budget_str:
                         try:
                             monthly_budget = float(budget_str)
@@ -130,14 +215,16 @@ class SheetsClient:
                             pass
 
                 categories.append({
-                    'category_id': padded_row[cat_id_idx].strip() if cat_id_idx < len(padded_row) else '',
-                    'category_name': padded_row[cat_name_idx].strip() if cat_name_idx < len(padded_row) else '',
-                    'parent_category': padded_row[parent_idx].strip() if parent_idx < len(padded_row) else '',
-                    'description': padded_row[desc_idx].strip() if desc_idx < len(padded_row) else '',
+                    'category_id': row[cat_id_idx].strip() if cat_id_idx < n else '',
+                    'category_name': row[cat_name_idx].strip() if cat_name_idx < n else '',
+                    'parent_category': row[parent_idx].strip() if parent_idx < n else '',
+                    'description': row[desc_idx].strip() if desc_idx < n else '',
                     'monthly_budget': monthly_budget,
                 })
             
             logger.info(f"Loaded {len(categories)} categories")
+            self._categories_cache = categories
+            self._categories_cache_time = time.time()
             return categories
             
         except Exception as e:
@@ -177,19 +264,19 @@ class SheetsClient:
                 if not row or not row[0]:
                     continue
 
-                padded_row = row + [''] * (4 - len(row))
+                n = len(row)
 
                 # Parse confidence as int, default to 100
                 try:
-                    confidence = int(padded_row[2]) if padded_row[2] else 100
+                    confidence = int(row[2]) if n > 2 and row[2] else 100
                 except ValueError:
                     confidence = 100
 
                 rules.append({
-                    'merchant_pattern': padded_row[0].strip().lower(),
-                    'category_id': padded_row[1].strip(),
+                    'merchant_pattern': row[0].strip().lower(),
+                    'category_id': row[1].strip() if n > 1 else '',
                     'confidence': confidence,
-                    'notes': padded_row[3].strip(),
+                    'notes': row[3].strip() if n > 3 else '',
                 })
 
             logger.info(f"Loaded {len(rules)} merchant rules")
@@ -203,6 +290,20 @@ class SheetsClient:
     def invalidate_merchant_rules_cache(self):
         """Clear the merchant rules cache."""
         self._merchant_rules_cache = None
+
+    def invalidate_categories_cache(self):
+        """Clear the categories cache."""
+        self._categories_cache = None
+
+    def invalidate_transaction_caches(self):
+        """
+        Clear the cached transaction rows and uncategorized row index.
+
+        Writes through this client keep them current; call this after
+        Processed Transactions was written some other way.
+        """
+        self._rows_cache = None
+        self._invalidate_uncategorized_rows()
     
     def get_keywords(self) -> List[Dict[str, Any]]:
         """
@@ -230,16 +331,16 @@ class SheetsClient:
                 if not row or not row[0]:
                     continue
                     
-                padded_row = row + [''] * (3 - len(row))
+                n = len(row)
                 
                 try:
-                    priority = int(padded_row[2]) if padded_row[2] else 10
+                    priority = int(row[2]) if n > 2 and row[2] else 10
                 except ValueError:
                     priority = 10
                 
                 keywords.append({
-                    'keyword': padded_row[0].strip().lower(),
-                    'category_id': padded_row[1].strip(),
+                    'keyword': row[0].strip().lower(),
+                    'category_id': row[1].strip() if n > 1 else '',
                     'priority': priority,
                 })
             
@@ -274,11 +375,19 @@ class SheetsClient:
             range=f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!1:1"
         ).execute()
         
-        headers = result.get('values', [[]])[0]
-        col_indices = {h: i for i, h in enumerate(headers)}
+        return self._cache_headers(result.get('values', [[]])[0])
+    
+    def _cache_headers(self, headers: List[str]) -> Tuple[List[str], Dict[str, int]]:
+        """
+        Cache a header row that was just read or written.
         
-        self._headers_cache[cache_key] = (headers, col_indices)
-        self._headers_cache_time[cache_key] = time.time()
+        The cache expires after HEADERS_CACHE_TTL since other scripts
+        (transaction_matcher) can rewrite the sheet, but any call that
+        already has the header row in hand refreshes it for free.
+        """
+        col_indices = {h: i for i, h in enumerate(headers)}
+        self._headers_cache['processed_transactions'] = (headers, col_indices)
+        self._headers_cache_time['processed_transactions'] = time.time()
         return headers, col_indices
     
     def ensure_categorization_columns(self, force_check: bool = False):
@@ -307,35 +416,88 @@ class SheetsClient:
         new_headers = headers + missing_columns
 
         # Write the new header row
-        service.spreadsheets().values().update(
+        self._execute_write(service.spreadsheets().values().update(
             spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
             range=f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!1:1",
             valueInputOption='RAW',
             body={'values': [new_headers]}
-        ).execute()
+        ))
 
         logger.info(f"Added categorization columns: {missing_columns}")
 
-        # Refresh cache
-        self._get_headers(force_refresh=True)
+        # Cache the header row just written instead of reading it back
+        self._cache_headers(new_headers)
         self._columns_verified = True
     
     def get_uncategorized_transactions(
         self, 
         limit: int = 50, 
-        offset: int = 0
+        offset: int = 0,
+        after_row: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Get transactions that don't have a claude_category yet.
         
+        Without after_row, pages through a cached index of uncategorized row
+        numbers (see _get_uncategorized_rows) and reads only the rows in the
+        requested page. Rows that turn out to be categorized since the index
+        was built are dropped from it and the page is refilled.
+        
         Args:
             limit: Max number of transactions to return
             offset: Number of transactions to skip (for pagination)
+            after_row: Only consider sheet rows after this row number.
+                Keyset cursor for paging: pass the last _row_number seen
+                instead of an offset, and only the rows after it are read.
             
         Returns:
             List of transaction dicts with row_number for writing back
         """
-        service = self._get_service()
+        if after_row is not None:
+            uncategorized = list(islice(
+                self.iter_uncategorized_transactions(after_row=after_row),
+                offset, offset + limit
+            ))
+            logger.info(f"Found {len(uncategorized)} uncategorized transactions")
+            return uncategorized
+        
+        headers, col_indices = self._get_headers()
+        index = self._get_uncategorized_rows()
+        claude_cat_idx = col_indices.get(COL_CLAUDE_CATEGORY)
+        category_source_idx = col_indices.get(COL_CATEGORY_SOURCE)
+        
+        uncategorized = []
+        stale = set()
+        pos = offset
+        while len(uncategorized) < limit and pos < len(index):
+            page = index[pos:pos + limit - len(uncategorized)]
+            pos += len(page)
+            for row_num, row in self._read_rows_by_number(page, len(headers)):
+                if self._is_uncategorized(row, claude_cat_idx, category_source_idx):
+                    uncategorized.append(self._row_to_transaction(row_num, row, headers))
+                else:
+                    stale.add(row_num)
+        
+        if stale:
+            self._uncategorized_rows = [r for r in index if r not in stale]
+        
+        logger.info(f"Found {len(uncategorized)} uncategorized transactions")
+        return uncategorized
+    
+    def _get_uncategorized_rows(self) -> List[int]:
+        """
+        Row numbers of uncategorized transactions, cached for UNCATEGORIZED_INDEX_TTL.
+        
+        Built from a column-only read (claude_category, category_source and
+        Date/Description so trailing rows count). write_categories removes the
+        rows it writes and the bulk edit methods drop the index entirely.
+        Writes made outside this client aren't seen until the index is
+        dropped (see invalidate_transaction_caches).
+        """
+        if (self._uncategorized_rows is not None and
+                time.time() - self._uncategorized_rows_time < self.UNCATEGORIZED_INDEX_TTL):
+            return self._uncategorized_rows
+        
         headers, col_indices = self._get_headers()
         
         # Ensure categorization columns exist
@@ -343,50 +505,152 @@ class SheetsClient:
             self.ensure_categorization_columns()
             headers, col_indices = self._get_headers(force_refresh=True)
         
-        # Read all data
-        result = service.spreadsheets().values().get(
+        columns = [COL_CLAUDE_CATEGORY, COL_CATEGORY_SOURCE, COL_DATE, COL_DESCRIPTION]
+        columns = [col for col in columns if col in col_indices]
+        
+        claude_cat_pos, source_pos = (
+            columns.index(col) if col in columns else None
+            for col in (COL_CLAUDE_CATEGORY, COL_CATEGORY_SOURCE)
+        )
+        
+        rows = []
+        for row_num, row in enumerate(
+            self.iter_transaction_columns([col_indices[col] for col in columns]), start=2
+        ):
+            if self._is_uncategorized(row, claude_cat_pos, source_pos):
+                rows.append(row_num)
+        
+        self._uncategorized_rows = rows
+        self._uncategorized_rows_time = time.time()
+        return rows
+    
+    def _invalidate_uncategorized_rows(self):
+        """Drop the uncategorized row index so the next read rebuilds it."""
+        self._uncategorized_rows = None
+    
+    def _read_rows_by_number(
+        self,
+        row_numbers: List[int],
+        width: int
+    ) -> Iterator[Tuple[int, List[str]]]:
+        """
+        Read the given Processed Transactions rows, `width` columns wide.
+        
+        Consecutive row numbers are fetched as one range, all in a single
+        batchGet. Yields (row_number, row) in the order given.
+        """
+        if not row_numbers:
+            return
+        
+        runs = []
+        for row_num in row_numbers:
+            if runs and row_num == runs[-1][1] + 1:
+                runs[-1][1] = row_num
+            else:
+                runs.append([row_num, row_num])
+        
+        last_col = column_index_to_letter(width - 1)
+        result = self._get_service().spreadsheets().values().batchGet(
             spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
-            range=f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!A:Z"
+            ranges=[
+                f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!A{first}:{last_col}{last}"
+                for first, last in runs
+            ],
+            fields='valueRanges(values)'
         ).execute()
         
-        values = result.get('values', [])
-        if len(values) < 2:
-            return []
+        for (first, last), value_range in zip(runs, result.get('valueRanges', [])):
+            values = value_range.get('values', [])
+            for offset, row_num in enumerate(range(first, last + 1)):
+                yield row_num, values[offset] if offset < len(values) else []
+    
+    @staticmethod
+    def _is_uncategorized(
+        row: List[str],
+        claude_cat_idx: Optional[int],
+        category_source_idx: Optional[int]
+    ) -> bool:
+        """True if the row has no claude_category and isn't a manual override."""
+        # Skip if already categorized
+        if claude_cat_idx is not None and claude_cat_idx < len(row):
+            if row[claude_cat_idx].strip():
+                return False
+        
+        # Skip if manually categorized (protect manual overrides)
+        if category_source_idx is not None and category_source_idx < len(row):
+            if row[category_source_idx].strip().lower() == 'manual':
+                return False
+        
+        return True
+    
+    @staticmethod
+    def _row_to_transaction(
+        row_num: int,
+        row: List[str],
+        headers: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Build a transaction dict (every header, '' when missing) for a sheet row.
+        
+        Filled with C-level zips rather than a per-header index lookup; as
+        with col_indices, a repeated header takes its last column's value.
+        """
+        trans = {'_row_number': row_num}
+        trans.update(zip(headers, row))
+        if len(row) < len(headers):
+            trans.update(zip(headers[len(row):], repeat('')))
+        return trans
+    
+    def iter_uncategorized_transactions(
+        self,
+        after_row: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate transactions that don't have a claude_category yet.
+        
+        Reads the sheet forward from after_row, ROW_PAGE_SIZE rows per
+        request, so a consumer that stops early only reads the pages it
+        used and a full pass reads each row once. Stops at the first empty
+        page.
+        
+        Args:
+            after_row: Only consider sheet rows after this row number
+            
+        Yields:
+            Transaction dicts with _row_number for writing back
+        """
+        service = self._get_service()
+        headers, col_indices = self._get_headers()
+        
+        # Ensure categorization columns exist
+        if COL_CLAUDE_CATEGORY not in col_indices:
+            self.ensure_categorization_columns()
+            headers, col_indices = self._get_headers(force_refresh=True)
         
-        # Find uncategorized rows
-        uncategorized = []
         claude_cat_idx = col_indices.get(COL_CLAUDE_CATEGORY)
         category_source_idx = col_indices.get(COL_CATEGORY_SOURCE)
         
-        for row_num, row in enumerate(values[1:], start=2):  # Start at 2 (1-indexed, skip header)
-            padded_row = row + [''] * (len(headers) - len(row))
-            
-            # Skip if already categorized
-            if claude_cat_idx is not None and claude_cat_idx < len(padded_row):
-                if padded_row[claude_cat_idx].strip():
-                    continue
+        # Read only as wide as the header row: every column is returned to
+        # the caller, but nothing past the last header is
+        last_col = column_index_to_letter(len(headers) - 1)
+        
+        start = max(after_row + 1, 2) if after_row else 2
+        while True:
+            end = start + self.ROW_PAGE_SIZE - 1
+            result = service.spreadsheets().values().get(
+                spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
+                range=f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!A{start}:{last_col}{end}"
+            ).execute()
             
-            # Skip if manually categorized (protect manual overrides)
-            if category_source_idx is not None and category_source_idx < len(padded_row):
-                if padded_row[category_source_idx].strip().lower() == 'manual':
-                    continue
+            values = result.get('values', [])
+            if not values:
+                return
             
-            # Build transaction dict
-            trans = {'_row_number': row_num}
-            for header in headers:
-                idx = col_indices.get(header)
-                if idx is not None and idx < len(padded_row):
-                    trans[header] = padded_row[idx]
-                else:
-                    trans[header] = ''
+            for row_num, row in enumerate(values, start=start):
+                if self._is_uncategorized(row, claude_cat_idx, category_source_idx):
+                    yield self._row_to_transaction(row_num, row, headers)
             
-            uncategorized.append(trans)
-        
-        # Apply offset and limit
-        uncategorized = uncategorized[offset:offset + limit]
-        
-        logger.info(f"Found {len(uncategorized)} uncategorized transactions")
-        return uncategorized
+            start = end + 1
     
     def write_categories(
         self, 
@@ -410,17 +674,47 @@ class SheetsClient:
             Dict with success count, error count, errors list
         """
         service = self._get_service()
-        headers, col_indices = self._get_headers()
         
-        # Ensure columns exist
+        # Ensure columns exist (this refreshes the header cache if it adds any)
         self.ensure_categorization_columns()
-        headers, col_indices = self._get_headers(force_refresh=True)
+        headers, col_indices = self._get_headers()
         
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         batch_id = batch_id or f"batch_{timestamp.replace(' ', '_').replace(':', '-')}"
         
-        # Build batch update data
-        batch_data = []
+        # Resolve target columns once per call: group the ones present into
+        # runs of adjacent sheet columns so each row is written as one range
+        # per run (usually a single range) instead of one range per cell
+        written = [
+            COL_CLAUDE_CATEGORY, COL_CATEGORY_SOURCE, COL_CATEGORY_CONFIDENCE,
+            COL_CATEGORIZED_AT, COL_CATEGORIZED_BY, COL_NEEDS_REVIEW,
+            COL_REVIEW_REASON,
+        ]
+        positions = sorted(
+            (col_indices[col_name], slot)
+            for slot, col_name in enumerate(written)
+            if col_name in col_indices
+        )
+        runs = []
+        for col_idx, slot in positions:
+            if runs and col_idx == runs[-1][1] + 1:
+                runs[-1][1] = col_idx
+                runs[-1][2].append(slot)
+            else:
+                runs.append([col_idx, col_idx, [slot]])
+        runs = [
+            (f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!{column_index_to_letter(first)}",
+             column_index_to_letter(last), slots)
+            for first, last, slots in runs
+        ]
+        categorized_by = f"mcp_v1:{batch_id}"
+        
+        # Build batch update data. Each run keeps an open block of
+        # [first_row, last_row, values, run]; an update for the next row
+        # extends it, so consecutive rows go out as one rectangular range
+        blocks = []
+        open_blocks = [None] * len(runs)
+        categorized_rows = set()
         errors = []
         
         for update in updates:
@@ -430,47 +724,54 @@ class SheetsClient:
                 continue
             
             try:
-                # Build cell updates for this row
-                cells = [
-                    (COL_CLAUDE_CATEGORY, update.get('category_id', '')),
-                    (COL_CATEGORY_SOURCE, update.get('source', 'claude')),
-                    (COL_CATEGORY_CONFIDENCE, str(update.get('confidence', ''))),
-                    (COL_CATEGORIZED_AT, timestamp),
-                    (COL_CATEGORIZED_BY, f"mcp_v1:{batch_id}"),
-                    (COL_NEEDS_REVIEW, 'TRUE' if update.get('needs_review') else ''),
-                    (COL_REVIEW_REASON, update.get('review_reason', '')),
-                ]
+                row_num = int(row_num)
                 
-                # Store previous category for undo
-                if COL_PREVIOUS_CATEGORY in col_indices:
-                    # Read current value first
-                    prev_idx = col_indices[COL_CLAUDE_CATEGORY]
-                    prev_col_letter = column_index_to_letter(prev_idx)
-                    # We'll batch this separately for efficiency
+                # Cell values for this row, in `written` order
+                cells = (
+                    update.get('category_id', ''),
+                    update.get('source', 'claude'),
+                    str(update.get('confidence', '')),
+                    timestamp,
+                    categorized_by,
+                    'TRUE' if update.get('needs_review') else '',
+                    update.get('review_reason', ''),
+                )
                 
-                for col_name, value in cells:
-                    if col_name not in col_indices:
-                        continue
-                    
-                    col_letter = column_index_to_letter(col_indices[col_name])
-                    batch_data.append({
-                        'range': f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!{col_letter}{row_num}",
-                        'values': [[value]]
-                    })
+                for run, (_, _, slots) in enumerate(runs):
+                    row_values = [cells[slot] for slot in slots]
+                    block = open_blocks[run]
+                    if block is not None and row_num == block[1] + 1:
+                        block[1] = row_num
+                        block[2].append(row_values)
+                    else:
+                        block = open_blocks[run] = [row_num, row_num, [row_values], run]
+                        blocks.append(block)
+                
+                if cells[0]:
+                    categorized_rows.add(row_num)
                     
             except Exception as e:
                 errors.append({'error': str(e), 'row': row_num})
         
-        # Execute batch update
+        batch_data = [
+            {
+                'range': f"{runs[run][0]}{first_row}:{runs[run][1]}{last_row}",
+                'values': values
+            }
+            for first_row, last_row, values, run in blocks
+        ]
+        
+        # Execute batch update, backing off on rate limits (429) and
+        # transient server errors so large runs don't fail mid-way
         if batch_data:
             try:
-                service.spreadsheets().values().batchUpdate(
+                self._execute_write(service.spreadsheets().values().batchUpdate(
                     spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
                     body={
                         'valueInputOption': 'RAW',
                         'data': batch_data
                     }
-                ).execute()
+                ))
             except Exception as e:
                 logger.error(f"Batch update failed: {e}")
                 return {
@@ -479,6 +780,12 @@ class SheetsClient:
                     'errors': [{'error': str(e)}]
                 }
         
+        # Written rows are no longer uncategorized
+        if categorized_rows and self._uncategorized_rows is not None:
+            self._uncategorized_rows = [
+                r for r in self._uncategorized_rows if r not in categorized_rows
+            ]
+        
         success_count = len(updates) - len(errors)
         logger.info(f"Wrote {success_count} categories, {len(errors)} errors")
         
@@ -493,60 +800,55 @@ class SheetsClient:
         """
         Get statistics about categorization progress.
         
+        Reads only the columns it counts (plus Date/Description so trailing
+        uncategorized rows are still counted) instead of the whole sheet.
+        
         Returns:
             Dict with counts and breakdowns
         """
-        service = self._get_service()
-        headers, col_indices = self._get_headers()
-        
-        result = service.spreadsheets().values().get(
-            spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
-            range=f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!A:Z"
-        ).execute()
+        _, col_indices = self._get_headers()
         
-        values = result.get('values', [])
-        if len(values) < 2:
+        counted = [COL_CLAUDE_CATEGORY, COL_CATEGORY_SOURCE, COL_NEEDS_REVIEW]
+        anchors = [COL_DATE, COL_DESCRIPTION]
+        columns = [col for col in counted + anchors if col in col_indices]
+        if not columns:
             return {'total': 0, 'categorized': 0, 'uncategorized': 0}
         
-        total = len(values) - 1  # Exclude header
-        
-        claude_cat_idx = col_indices.get(COL_CLAUDE_CATEGORY)
-        source_idx = col_indices.get(COL_CATEGORY_SOURCE)
-        review_idx = col_indices.get(COL_NEEDS_REVIEW)
+        # Position of each counted column in the fetched row tuples
+        claude_cat_pos, source_pos, review_pos = (
+            columns.index(col) if col in columns else None for col in counted
+        )
         
+        total = 0
         categorized = 0
-        uncategorized = 0
         by_source = {'merchant_rule': 0, 'keyword': 0, 'claude': 0, 'manual': 0}
         needs_review = 0
         
-        for row in values[1:]:
-            padded_row = row + [''] * (len(headers) - len(row))
+        for row in self.iter_transaction_columns([col_indices[col] for col in columns]):
+            total += 1
             
             # Check if categorized
-            if claude_cat_idx and claude_cat_idx < len(padded_row):
-                if padded_row[claude_cat_idx].strip():
-                    categorized += 1
-                    
-                    # Count by source
-                    if source_idx and source_idx < len(padded_row):
-                        source = padded_row[source_idx].strip().lower()
-                        if source in by_source:
-                            by_source[source] += 1
-                else:
-                    uncategorized += 1
-            else:
-                uncategorized += 1
+            if claude_cat_pos is not None and row[claude_cat_pos].strip():
+                categorized += 1
+                
+                # Count by source
+                if source_pos is not None:
+                    source = row[source_pos].strip().lower()
+                    if source in by_source:
+                        by_source[source] += 1
             
             # Count needs review
-            if review_idx and review_idx < len(padded_row):
-                if padded_row[review_idx].strip().upper() == 'TRUE':
-                    needs_review += 1
+            if review_pos is not None and row[review_pos].strip().upper() == 'TRUE':
+                needs_review += 1
+        
+        if total == 0:
+            return {'total': 0, 'categorized': 0, 'uncategorized': 0}
         
         return {
             'total': total,
             'categorized': categorized,
-            'uncategorized': uncategorized,
-            'percent_complete': round(categorized / total * 100, 1) if total > 0 else 0,
+            'uncategorized': total - categorized,
+            'percent_complete': round(categorized / total * 100, 1),
             'by_source': by_source,
             'needs_review': needs_review,
         }
@@ -566,6 +868,30 @@ class SheetsClient:
         Returns:
             True if successful
         """
+        return self.flag_rows_for_review([row_number], reason)
+    
+    def flag_rows_for_review(
+        self,
+        row_numbers: List[int],
+        reason: str
+    ) -> bool:
+        """
+        Flag several transactions for human review in one batchUpdate.
+        
+        Each row gets one range when needs_review and review_reason are
+        adjacent columns (as ensure_categorization_columns adds them),
+        otherwise two.
+        
+        Args:
+            row_numbers: The rows to flag
+            reason: Why they need review
+            
+        Returns:
+            True if successful
+        """
+        if not row_numbers:
+            return True
+        
         service = self._get_service()
         headers, col_indices = self._get_headers()
         
@@ -573,30 +899,35 @@ class SheetsClient:
             self.ensure_categorization_columns()
             headers, col_indices = self._get_headers(force_refresh=True)
         
-        review_col = column_index_to_letter(col_indices[COL_NEEDS_REVIEW])
-        reason_col = column_index_to_letter(col_indices[COL_REVIEW_REASON])
+        review_idx = col_indices[COL_NEEDS_REVIEW]
+        reason_idx = col_indices[COL_REVIEW_REASON]
+        review_col = column_index_to_letter(review_idx)
+        reason_col = column_index_to_letter(reason_idx)
+        sheet = f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'"
+        
+        data = []
+        for row_number in row_numbers:
+            if reason_idx == review_idx + 1:
+                data.append({
+                    'range': f"{sheet}!{review_col}{row_number}:{reason_col}{row_number}",
+                    'values': [['TRUE', reason]]
+                })
+            else:
+                data.append({'range': f"{sheet}!{review_col}{row_number}", 'values': [['TRUE']]})
+                data.append({'range': f"{sheet}!{reason_col}{row_number}", 'values': [[reason]]})
         
         try:
-            service.spreadsheets().values().batchUpdate(
+            self._execute_write(service.spreadsheets().values().batchUpdate(
                 spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
                 body={
                     'valueInputOption': 'RAW',
-                    'data': [
-                        {
-                            'range': f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!{review_col}{row_number}",
-                            'values': [['TRUE']]
-                        },
-                        {
-                            'range': f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!{reason_col}{row_number}",
-                            'values': [[reason]]
-                        }
-                    ]
+                    'data': data
                 }
-            ).execute()
+            ))
             return True
             
         except Exception as e:
-            logger.error(f"Failed to flag row {row_number}: {e}")
+            logger.error(f"Failed to flag rows {row_numbers}: {e}")
             return False
     
     # ========================================================================
@@ -624,8 +955,6 @@ class SheetsClient:
         Returns:
             Dict with success status and details
         """
-        service = self._get_service()
-
         # Normalize the pattern
         merchant_pattern = merchant_pattern.strip().lower()
 
@@ -650,42 +979,104 @@ class SheetsClient:
                         'existing_rule': rule
                     }
 
-        # Append new rule
-        new_row = [[merchant_pattern, category_id, confidence, notes]]
+        # Write through the bulk path (validated above)
+        result = self.add_merchant_rules([{
+            'merchant_pattern': merchant_pattern,
+            'category_id': category_id,
+            'confidence': confidence,
+            'notes': notes,
+        }], skip_duplicate_check=True)
+        if not result['success']:
+            return {'success': False, 'error': result['error']}
+
+        return {
+            'success': True,
+            'merchant_pattern': merchant_pattern,
+            'category_id': category_id,
+            'confidence': confidence,
+            'notes': notes
+        }
+
+    def add_merchant_rules(
+        self,
+        rules: List[Dict[str, Any]],
+        skip_duplicate_check: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Add several merchant rules to the Budget Config sheet in one append.
+
+        Each rule is validated like add_merchant_rule(); rules that fail
+        validation are reported in 'skipped' and the rest are written in a
+        single API call.
+
+        Args:
+            rules: Dicts with merchant_pattern, category_id and optional
+                confidence (default 100) and notes
+            skip_duplicate_check: If True, don't check existing rules (for bulk ops)
+
+        Returns:
+            Dict with success status, 'added' rules and 'skipped' patterns
+        """
+        MIN_PATTERN_LENGTH = 4
+        existing = set()
+        if not skip_duplicate_check:
+            existing = {r['merchant_pattern'] for r in self.get_merchant_rules(use_cache=True)}
+
+        added = []
+        skipped = []
+        for rule in rules:
+            merchant_pattern = rule['merchant_pattern'].strip().lower()
+            if len(merchant_pattern) < MIN_PATTERN_LENGTH:
+                skipped.append({
+                    'merchant_pattern': merchant_pattern,
+                    'error': f"Pattern too short (min {MIN_PATTERN_LENGTH} chars)"
+                })
+                continue
+            if merchant_pattern in existing:
+                skipped.append({
+                    'merchant_pattern': merchant_pattern,
+                    'error': f"Rule for '{merchant_pattern}' already exists"
+                })
+                continue
+            existing.add(merchant_pattern)
+            added.append({
+                'merchant_pattern': merchant_pattern,
+                'category_id': rule['category_id'],
+                'confidence': rule.get('confidence', 100),
+                'notes': rule.get('notes', ''),
+            })
+
+        if not added:
+            return {'success': True, 'added': [], 'skipped': skipped}
 
         try:
-            service.spreadsheets().values().append(
+            service = self._get_service()
+            self._execute_write(service.spreadsheets().values().append(
                 spreadsheetId=BUDGET_CONFIG_SHEET_ID,
                 range=f"'{CONFIG_MERCHANT_RULES_TAB}'!A:D",
                 valueInputOption='RAW',
                 insertDataOption='INSERT_ROWS',
-                body={'values': new_row}
-            ).execute()
+                body={'values': [
+                    [r['merchant_pattern'], r['category_id'], r['confidence'], r['notes']]
+                    for r in added
+                ]}
+            ), idempotent=False)
 
-            logger.info(f"Added merchant rule: {merchant_pattern} -> {category_id}")
+            logger.info(f"Added {len(added)} merchant rules")
 
             # Update cache if it exists
             if self._merchant_rules_cache is not None:
-                self._merchant_rules_cache.append({
-                    'merchant_pattern': merchant_pattern,
-                    'category_id': category_id,
-                    'confidence': confidence,
-                    'notes': notes,
-                })
+                self._merchant_rules_cache.extend(dict(r) for r in added)
 
-            return {
-                'success': True,
-                'merchant_pattern': merchant_pattern,
-                'category_id': category_id,
-                'confidence': confidence,
-                'notes': notes
-            }
+            return {'success': True, 'added': added, 'skipped': skipped}
 
         except Exception as e:
-            logger.error(f"Failed to add merchant rule: {e}")
+            logger.error(f"Failed to add merchant rules: {e}")
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'added': [],
+                'skipped': skipped
             }
     
     def add_keyword(
@@ -705,8 +1096,6 @@ class SheetsClient:
         Returns:
             Dict with success status and details
         """
-        service = self._get_service()
-        
         # Normalize the keyword
         keyword = keyword.strip().lower()
         
@@ -720,32 +1109,89 @@ class SheetsClient:
                     'existing_keyword': kw
                 }
         
-        # Append new keyword
-        new_row = [[keyword, category_id, priority]]
+        # Write through the bulk path (checked above)
+        result = self.add_keywords([{
+            'keyword': keyword,
+            'category_id': category_id,
+            'priority': priority,
+        }], skip_duplicate_check=True)
+        if not result['success']:
+            return {'success': False, 'error': result['error']}
+        
+        return {
+            'success': True,
+            'keyword': keyword,
+            'category_id': category_id,
+            'priority': priority
+        }
+    
+    def add_keywords(
+        self,
+        keywords: List[Dict[str, Any]],
+        skip_duplicate_check: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Add several keyword rules to the Budget Config sheet in one append.
+        
+        Keywords already in the sheet (or repeated in the input) are
+        reported in 'skipped' and the rest are written in a single API call.
+        
+        Args:
+            keywords: Dicts with keyword, category_id and optional
+                priority (default 10)
+            skip_duplicate_check: If True, don't check existing keywords (for bulk ops)
+            
+        Returns:
+            Dict with success status, 'added' keywords and 'skipped' keywords
+        """
+        existing = set()
+        if not skip_duplicate_check:
+            existing = {kw['keyword'] for kw in self.get_keywords()}
+        
+        added = []
+        skipped = []
+        for kw in keywords:
+            keyword = kw['keyword'].strip().lower()
+            if keyword in existing:
+                skipped.append({
+                    'keyword': keyword,
+                    'error': f"Keyword '{keyword}' already exists"
+                })
+                continue
+            existing.add(keyword)
+            added.append({
+                'keyword': keyword,
+                'category_id': kw['category_id'],
+                'priority': kw.get('priority', 10),
+            })
+        
+        if not added:
+            return {'success': True, 'added': [], 'skipped': skipped}
         
         try:
-            service.spreadsheets().values().append(
+            service = self._get_service()
+            self._execute_write(service.spreadsheets().values().append(
                 spreadsheetId=BUDGET_CONFIG_SHEET_ID,
                 range=f"'{CONFIG_KEYWORDS_TAB}'!A:C",
                 valueInputOption='RAW',
                 insertDataOption='INSERT_ROWS',
-                body={'values': new_row}
-            ).execute()
+                body={'values': [
+                    [kw['keyword'], kw['category_id'], kw['priority']]
+                    for kw in added
+                ]}
+            ), idempotent=False)
             
-            logger.info(f"Added keyword: {keyword} -> {category_id}")
+            logger.info(f"Added {len(added)} keywords")
             
-            return {
-                'success': True,
-                'keyword': keyword,
-                'category_id': category_id,
-                'priority': priority
-            }
+            return {'success': True, 'added': added, 'skipped': skipped}
             
         except Exception as e:
-            logger.error(f"Failed to add keyword: {e}")
+            logger.error(f"Failed to add keywords: {e}")
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'added': [],
+                'skipped': skipped
             }
     
     # ========================================================================
@@ -756,23 +1202,18 @@ class SheetsClient:
         """Parse date string in common formats."""
         if not date_str:
             return None
-        for fmt in ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y'):
-            try:
-                return datetime.strptime(date_str.strip(), fmt)
-            except ValueError:
-                continue
-        return None
+        return _parse_sheet_date(date_str)
 
     def _parse_amount(self, amount_str: str) -> Optional[float]:
         """Parse amount string, handling $, commas, and (parentheses) as negative."""
         if not amount_str:
             return None
-        s = str(amount_str).strip()
+        s = (amount_str if isinstance(amount_str, str) else str(amount_str)).strip()
         negative = False
         if s.startswith('(') and s.endswith(')'):
             negative = True
             s = s[1:-1]
-        s = s.replace('$', '').replace(',', '')
+        s = s.translate(_MONEY_CHARS)
         try:
             val = float(s)
             return -val if negative else val
@@ -792,8 +1233,71 @@ class SheetsClient:
         values = result.get('values', [])
         if not values:
             return [], [], {}
-        headers = values[0]
-        col_indices = {h: i for i, h in enumerate(headers)}
+        # The header row came with the data; keep it so _get_headers() skips a read
+        headers, col_indices = self._cache_headers(values[0])
+        return values, headers, col_indices
+
+    def iter_transaction_columns(self, col_indices: List[int]) -> Iterator[Tuple[str, ...]]:
+        """
+        Iterate selected columns of Processed Transactions (data rows only).
+
+        Fetches just the requested columns, COLUMN_PAGE_SIZE rows per
+        batchGet, so only one page is held in memory and no single response
+        grows with the sheet. Yields one tuple per row, in the order the
+        columns were requested, with missing cells as '', so the n-th tuple
+        is sheet row n + 2. Stops at the first page with no values.
+        """
+        service = self._get_service()
+        letters = [column_index_to_letter(idx) for idx in col_indices]
+        blank_row = ('',) * len(letters)
+        pending_blanks = 0
+        start = 2
+        while True:
+            end = start + self.COLUMN_PAGE_SIZE - 1
+            result = service.spreadsheets().values().batchGet(
+                spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
+                ranges=[
+                    f"'{PROCESSED_TRANSACTIONS_SHEET_NAME}'!{letter}{start}:{letter}{end}"
+                    for letter in letters
+                ],
+                majorDimension='COLUMNS',
+                fields='valueRanges(values)'
+            ).execute()
+            columns = [(vr.get('values') or [[]])[0] for vr in result.get('valueRanges', [])]
+            if not any(columns):
+                return
+            # The API trims trailing empty rows from a page; they only
+            # matter (to keep row numbering) if a later page has data
+            for _ in range(pending_blanks):
+                yield blank_row
+            rows = list(zip_longest(*columns, fillvalue=''))
+            yield from rows
+            pending_blanks = self.COLUMN_PAGE_SIZE - len(rows)
+            start = end + 1
+
+    def read_transaction_rows(self) -> Tuple[List[List[str]], List[str], Dict[str, int]]:
+        """
+        Read all Processed Transactions rows, ensuring categorization columns exist.
+
+        The result can be passed as `rows` to query_transactions() and
+        get_spending_summary() so several reports share one sheet read.
+        It is also cached for ROWS_CACHE_TTL seconds (dropped on any write
+        through this client and by invalidate_transaction_caches), so
+        back-to-back report calls skip the download. The rows are shared: treat them as read-only.
+
+        Returns:
+            (all_values, headers, col_indices)
+        """
+        cache_age = time.time() - self._rows_cache_time
+        if self._rows_cache is not None and cache_age < self.ROWS_CACHE_TTL:
+            return self._rows_cache
+
+        values, headers, col_indices = self._read_all_rows()
+        if values and COL_CLAUDE_CATEGORY not in col_indices:
+            self.ensure_categorization_columns()
+            values, headers, col_indices = self._read_all_rows()
+        self._rows_cache = (values, headers, col_indices)
+        self._rows_cache_time = time.time()
         return values, headers, col_indices
 
     def _apply_filters(
@@ -829,7 +1333,7 @@ class SheetsClient:
         f_amount_min = filters.get('amount_min')
         f_amount_max = filters.get('amount_max')
         f_uncategorized = filters.get('uncategorized_only', False)
-        f_account = filters.get('account')
+        f_account = filters.get('account').lower() if filters.get('account') is not None else None
 
         for row_num, row in enumerate(values[1:], start=2):
             padded = row + [''] * (num_headers - len(row))
@@ -891,7 +1395,7 @@ class SheetsClient:
             # account filter
             if f_account is not None:
                 val = padded[account_idx].strip().lower() if account_idx is not None else ''
-                if f_account.lower() not in val:
+                if f_account not in val:
                     continue
 
             results.append((row_num, padded))
@@ -906,22 +1410,19 @@ class SheetsClient:
         self,
         filters: Dict[str, Any],
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        rows: Optional[Tuple[List[List[str]], List[str], Dict[str, int]]] = None
     ) -> Dict[str, Any]:
         """
         Search and filter transactions with flexible criteria.
         Returns paginated results with optional category summary.
+        Pass `rows` from read_transaction_rows() to reuse an earlier read.
         """
-        values, headers, col_indices = self._read_all_rows()
+        values, headers, col_indices = rows if rows is not None else self.read_transaction_rows()
         if not values:
             return {'total_matching': 0, 'offset': offset, 'limit': limit,
                     'has_more': False, 'transactions': []}
 
-        # Ensure categorization columns exist
-        if COL_CLAUDE_CATEGORY not in col_indices:
-            self.ensure_categorization_columns()
-            values, headers, col_indices = self._read_all_rows()
-
         matching = self._apply_filters(values, headers, col_indices, filters)
         total_matching = len(matching)
 
@@ -1036,10 +1537,12 @@ class SheetsClient:
                 batch_data.append({'range': f"{sheet}!{reason_col}{row_num}", 'values': [['']]})
 
         if batch_data:
-            service.spreadsheets().values().batchUpdate(
+            self._execute_write(service.spreadsheets().values().batchUpdate(
                 spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
                 body={'valueInputOption': 'RAW', 'data': batch_data}
-            ).execute()
+            ))
+
+        self._invalidate_uncategorized_rows()
 
         return {
             'success': True,
@@ -1109,10 +1612,12 @@ class SheetsClient:
                 batch_data.append({'range': f"{sheet}!{col_letter}{row_num}", 'values': [['']]})
 
         if batch_data:
-            service.spreadsheets().values().batchUpdate(
+            self._execute_write(service.spreadsheets().values().batchUpdate(
                 spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
                 body={'valueInputOption': 'RAW', 'data': batch_data}
-            ).execute()
+            ))
+
+        self._invalidate_uncategorized_rows()
 
         return {
             'success': True,
@@ -1125,21 +1630,19 @@ class SheetsClient:
         self,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
-        category_taxonomy: Optional[List[Dict[str, Any]]] = None
+        category_taxonomy: Optional[List[Dict[str, Any]]] = None,
+        rows: Optional[Tuple[List[List[str]], List[str], Dict[str, int]]] = None
     ) -> Dict[str, Any]:
         """
         Get pre-aggregated spending data grouped by category.
         Returns hierarchical breakdown with budget comparison.
+        Pass `rows` from read_transaction_rows() to reuse an earlier read.
         """
-        values, headers, col_indices = self._read_all_rows()
+        values, headers, col_indices = rows if rows is not None else self.read_transaction_rows()
         if not values:
             return {'period': {}, 'total_income': 0, 'total_expenses': 0,
                     'net': 0, 'by_parent_category': {}, 'uncategorized': {'total': 0, 'count': 0}}
 
-        if COL_CLAUDE_CATEGORY not in col_indices:
-            self.ensure_categorization_columns()
-            values, headers, col_indices = self._read_all_rows()
-
         filters = {}
         if date_from:
             filters['date_from'] = date_from
@@ -1294,13 +1797,13 @@ class SheetsClient:
                 }
             
             # Batch update
-            service.spreadsheets().values().batchUpdate(
+            self._execute_write(service.spreadsheets().values().batchUpdate(
                 spreadsheetId=PROCESSED_TRANSACTIONS_SHEET_ID,
                 body={
                     'valueInputOption': 'RAW',
                     'data': updates
                 }
-            ).execute()
+            ))
             
             logger.info(f"Migrated {len(updates)} transactions: {old_category_id} -> {new_category_id}")
             
@@ -8,12 +8,21 @@ Run this to verify the categorizer logic works before starting the MCP server.
 import sys
 import os
 import logging
+import random
+import re
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from categorizer import TransactionCategorizer, test_categorization
-from config import COL_DESCRIPTION, COL_AMOUNT
+from categorizer import TransactionCategorizer, MerchantPatternIndex, test_categorization
+from config import (
+    COL_DESCRIPTION,
+    COL_AMOUNT,
+    COL_DATE,
+    COL_CLAUDE_CATEGORY,
+    COL_CATEGORY_SOURCE,
+    CATEGORIZATION_COLUMNS,
+)
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
@@ -73,13 +82,13 @@ def test_with_real_config():
         print("=== AUTO-CATEGORIZED ===")
         for trans in results['auto_categorized']:
             cat = trans['_categorization']
-            print(f"  [{cat['source']:15}] {trans[COL_DESCRIPTION][:35]:35} → {cat['category_id']}")
+            print(f"  [{cat.source:15}] {trans[COL_DESCRIPTION][:35]:35} → {cat.category_id}")
         print()
         
         print("=== NEEDS CLAUDE ===")
         for trans in results['needs_claude']:
             cat = trans['_categorization']
-            reason = cat.get('review_reason', 'No rules matched')
+            reason = cat.review_reason or 'No rules matched'
             print(f"  {trans[COL_DESCRIPTION][:45]:45} | {reason}")
         print()
         
@@ -145,6 +154,306 @@ def test_sheets_client():
         return False
 
 
+def test_merchant_rule_matching():
+    """Check the indexed merchant matching against a plain scan (offline)."""
+    print("=" * 60)
+    print("Testing Merchant Rule Matching")
+    print("=" * 60)
+    print()
+    
+    # A small alphabet makes short, overlapping and duplicate patterns common
+    rng = random.Random(0)
+    def word(min_len, max_len):
+        return ''.join(rng.choice('abc ') for _ in range(rng.randint(min_len, max_len)))
+    
+    categories = [{'category_id': 'misc', 'category_name': 'Misc', 'parent_category': '', 'description': ''}]
+    patterns = [word(1, 8).strip() or 'a' for _ in range(60)]
+    merchant_rules = [
+        {'merchant_pattern': p, 'category_id': 'misc', 'confidence': 100, 'notes': ''}
+        for p in patterns
+    ]
+    categorizer = TransactionCategorizer(categories, merchant_rules, [])
+    index = MerchantPatternIndex(patterns)
+    
+    for _ in range(2000):
+        description = word(0, 20).upper()
+        
+        # The first rule in categorizer order (longest first) found anywhere wins
+        expected = next(
+            (r['merchant_pattern'] for r in categorizer.merchant_rules
+             if r['merchant_pattern'] in description.lower()),
+            None
+        )
+        result = categorizer.apply_merchant_rules(description)
+        assert (result.matched_pattern if result else None) == expected, description
+        
+        candidate = description.lower().strip()
+        if candidate:
+            expected_covered = any(p in candidate or candidate in p for p in patterns)
+            assert index.covers(candidate) == expected_covered, candidate
+    
+    print("  Prefix index and MerchantPatternIndex match a plain scan")
+    print()
+    return True
+
+
+class FakeSheetsService:
+    """
+    In-memory stand-in for the Sheets values API, enough for SheetsClient.
+    
+    Holds one grid (row 1 is the header row) and, like the real API, trims
+    trailing empty cells and rows from every range it returns.
+    """
+    
+    _RANGE_RE = re.compile(r"!([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+    
+    def __init__(self, grid):
+        self.grid = [list(row) for row in grid]
+        self.calls = []  # API method names, in call order
+        self.batch_updates = []  # 'data' of each batchUpdate
+    
+    # spreadsheets() and values() both return the service itself
+    def spreadsheets(self):
+        return self
+    
+    def values(self):
+        return self
+    
+    @staticmethod
+    def _column_index(letters):
+        index = 0
+        for ch in letters:
+            index = index * 26 + ord(ch) - 64
+        return index - 1
+    
+    def _bounds(self, a1_range):
+        """(first_row, last_row, first_col, last_col), 1-based rows, inclusive."""
+        first_col, first_row, last_col, last_row = self._RANGE_RE.search(a1_range).groups()
+        last_col = last_col if last_col is not None else first_col
+        last_row = last_row if last_row is not None else first_row
+        return (
+            int(first_row or 1),
+            int(last_row) if last_row else len(self.grid),
+            self._column_index(first_col) if first_col else 0,
+            self._column_index(last_col) if last_col else max(map(len, self.grid), default=0),
+        )
+    
+    @staticmethod
+    def _trim(lines):
+        lines = [list(line) for line in lines]
+        for line in lines:
+            while line and line[-1] == '':
+                line.pop()
+        while lines and not lines[-1]:
+            lines.pop()
+        return lines
+    
+    def _read(self, a1_range, major_dimension='ROWS'):
+        first_row, last_row, first_col, last_col = self._bounds(a1_range)
+        block = [
+            [row[col] if col < len(row) else '' for col in range(first_col, last_col + 1)]
+            for row in self.grid[first_row - 1:last_row]
+        ]
+        if major_dimension == 'COLUMNS':
+            block = list(zip(*block))
+        values = self._trim(block)
+        return {'values': values} if values else {}
+    
+    def _write(self, a1_range, values):
+        first_row, _, first_col, _ = self._bounds(a1_range)
+        for r, row_values in enumerate(values, start=first_row - 1):
+            while len(self.grid) <= r:
+                self.grid.append([])
+            row = self.grid[r]
+            for c, value in enumerate(row_values, start=first_col):
+                row.extend([''] * (c + 1 - len(row)))
+                row[c] = value
+    
+    def _request(self, name, result):
+        self.calls.append(name)
+        return FakeRequest(result)
+    
+    def get(self, spreadsheetId, range, **kwargs):
+        return self._request('get', lambda: self._read(range))
+    
+    def batchGet(self, spreadsheetId, ranges, majorDimension='ROWS', **kwargs):
+        return self._request('batchGet', lambda: {
+            'valueRanges': [self._read(r, majorDimension) for r in ranges]
+        })
+    
+    def update(self, spreadsheetId, range, body, **kwargs):
+        return self._request('update', lambda: self._write(range, body['values']))
+    
+    def batchUpdate(self, spreadsheetId, body):
+        def execute():
+            self.batch_updates.append(body['data'])
+            for data in body['data']:
+                self._write(data['range'], data['values'])
+            return {}
+        return self._request('batchUpdate', execute)
+
+
+class FakeRequest:
+    """A prepared FakeSheetsService call; runs when executed."""
+    
+    def __init__(self, result):
+        self._result = result
+    
+    def execute(self):
+        return self._result()
+
+
+def _fake_sheets_client(grid, page_size=4):
+    """A SheetsClient reading from a FakeSheetsService, with small pages."""
+    from sheets_client import SheetsClient
+    
+    client = SheetsClient()
+    client._service = FakeSheetsService(grid)
+    client.COLUMN_PAGE_SIZE = page_size
+    client.ROW_PAGE_SIZE = page_size - 1  # pages that don't line up with the column pages
+    return client
+
+
+def _transaction_grid():
+    """Header row plus data rows: categorized, manual, blank and uncategorized."""
+    headers = [COL_DATE, COL_DESCRIPTION, COL_AMOUNT] + CATEGORIZATION_COLUMNS
+    cat_col = headers.index(COL_CLAUDE_CATEGORY)
+    source_col = headers.index(COL_CATEGORY_SOURCE)
+    
+    def row(description, category='', source=''):
+        cells = ['2024-01-01', description, '-$1.00'] + [''] * len(CATEGORIZATION_COLUMNS)
+        cells[cat_col] = category
+        cells[source_col] = source
+        return cells
+    
+    return [
+        headers,
+        row('SHELL OIL', 'gas', 'merchant_rule'),  # row 2
+        row('WHOLE FOODS'),                        # row 3
+        [],                                        # row 4: blank, ends page 1 early
+        [],                                        # row 5
+        row('MANUAL STORE', '', 'manual'),         # row 6
+        row('RANDOM STORE'),                       # row 7
+        row('TRADER JOE', 'groceries', 'keyword'), # row 8
+        [],                                        # row 9
+        row('CHEVRON'),                            # row 10
+        row('TARGET'),                             # row 11
+        row('NETFLIX.COM'),                        # row 12
+    ]
+
+
+def _expected_uncategorized(grid):
+    """Row numbers a full scan of grid reports as uncategorized."""
+    headers = grid[0]
+    cat_col = headers.index(COL_CLAUDE_CATEGORY)
+    source_col = headers.index(COL_CATEGORY_SOURCE)
+    last = max(i for i, row in enumerate(grid) if any(row)) + 1
+    expected = []
+    for row_num in range(2, last + 1):
+        row = grid[row_num - 1]
+        cells = row + [''] * (len(headers) - len(row))
+        if not cells[cat_col] and cells[source_col] != 'manual':
+            expected.append(row_num)
+    return expected
+
+
+def test_transaction_paging_offline():
+    """Check uncategorized row numbering and paging against a fake sheet."""
+    print("=" * 60)
+    print("Testing Transaction Paging (fake sheet)")
+    print("=" * 60)
+    print()
+    
+    grid = _transaction_grid()
+    expected = _expected_uncategorized(grid)
+    client = _fake_sheets_client(grid)
+    
+    # Column pages: rows 4-5 end page 1, so the page comes back short and
+    # must be padded to keep later row numbers right
+    assert client._get_uncategorized_rows() == expected, client._get_uncategorized_rows()
+    print(f"  Uncategorized index: {expected}")
+    
+    # Offset paging through the index
+    rows = [t['_row_number'] for t in client.get_uncategorized_transactions(limit=100)]
+    assert rows == expected, rows
+    rows = [t['_row_number'] for t in client.get_uncategorized_transactions(limit=2, offset=1)]
+    assert rows == expected[1:3], rows
+    
+    # Keyset paging: each call resumes after the last row seen. It reads
+    # whole rows, where the API drops blank ones at the end of a page, so
+    # compare the rows that have data
+    rows = []
+    cursor = 0
+    while True:
+        page = client.get_uncategorized_transactions(limit=2, after_row=cursor)
+        if not page:
+            break
+        rows.extend(t['_row_number'] for t in page if t[COL_DESCRIPTION])
+        cursor = page[-1]['_row_number']
+    assert rows == [r for r in expected if grid[r - 1]], rows
+    print("  Offset and after_row paging agree with a full scan")
+    print()
+    return True
+
+
+def test_write_categories_offline():
+    """Check write_categories ranges and uncategorized index upkeep."""
+    print("=" * 60)
+    print("Testing write_categories (fake sheet)")
+    print("=" * 60)
+    print()
+    
+    grid = _transaction_grid()
+    client = _fake_sheets_client(grid)
+    service = client._service
+    headers = grid[0]
+    cat_col = headers.index(COL_CLAUDE_CATEGORY)
+    
+    expected = _expected_uncategorized(grid)
+    assert client._get_uncategorized_rows() == expected
+    
+    # Rows 10-12 are consecutive and should go out as one range; row 3 alone
+    result = client.write_categories([
+        {'row_number': 10, 'category_id': 'gas', 'source': 'merchant_rule', 'confidence': 100},
+        {'row_number': 11, 'category_id': 'shopping', 'source': 'claude', 'confidence': 80,
+         'needs_review': True, 'review_reason': 'Ambiguous merchant'},
+        {'row_number': 12, 'category_id': 'streaming', 'source': 'keyword', 'confidence': 60},
+        {'row_number': 3, 'category_id': 'groceries', 'source': 'merchant_rule', 'confidence': 100},
+    ])
+    assert result['success_count'] == 4 and result['error_count'] == 0, result
+    # The written columns are adjacent, so each block is one range
+    first = chr(ord('A') + cat_col)
+    last = chr(ord(first) + 6)
+    ranges = [data['range'] for data in service.batch_updates[-1]]
+    assert ranges == [
+        f"'Processed Transactions'!{first}10:{last}12",
+        f"'Processed Transactions'!{first}3:{last}3",
+    ], ranges
+    for row_num, category in ((3, 'groceries'), (10, 'gas'), (11, 'shopping'), (12, 'streaming')):
+        assert service.grid[row_num - 1][cat_col] == category, (row_num, service.grid[row_num - 1])
+    print(f"  Wrote 4 rows as {len(ranges)} ranges: {ranges}")
+    
+    # Written rows leave the cached index without another read
+    reads = len(service.calls)
+    remaining = [r for r in expected if r not in (3, 10, 11, 12)]
+    assert client._get_uncategorized_rows() == remaining, client._get_uncategorized_rows()
+    assert len(service.calls) == reads
+    assert client._get_uncategorized_rows() == _expected_uncategorized(service.grid)
+    
+    # Rows added by another writer only show up once the caches are dropped
+    client.read_transaction_rows()
+    service.grid.append(['2024-01-02', 'NEW MERCHANT', '-$2.00'])
+    new_row = len(service.grid)
+    assert client._get_uncategorized_rows() == remaining
+    assert len(client.read_transaction_rows()[0]) == new_row - 1
+    client.invalidate_transaction_caches()
+    assert client._get_uncategorized_rows() == remaining + [new_row], client._get_uncategorized_rows()
+    assert len(client.read_transaction_rows()[0]) == new_row
+    print("  Index tracks writes and picks up external rows after invalidation")
+    print()
+    return True
+
+
 def main():
     """Run all tests."""
     print()
@@ -159,6 +468,16 @@ def main():
     test_categorization()
     print()
     
+    # Offline checks of the indexes and paging (no Google credentials used)
+    print("TEST 2: Merchant Rule Matching")
+    print("-" * 40)
+    test_merchant_rule_matching()
+    
+    print("TEST 3: Sheets Client Paging (fake sheet)")
+    print("-" * 40)
+    test_transaction_paging_offline()
+    test_write_categories_offline()
+    
     # Check if config sheet is set up
     from config import BUDGET_CONFIG_SHEET_ID
     
@@ -172,13 +491,13 @@ def main():
     
     # Test 2: Real config from sheets
     print()
-    print("TEST 2: Categorizer with Real Config")
+    print("TEST 4: Categorizer with Real Config")
     print("-" * 40)
     test_with_real_config()
     
     # Test 3: Sheets client
     print()
-    print("TEST 3: Sheets Client")
+    print("TEST 5: Sheets Client")
     print("-" * 40)
     test_sheets_client()
     
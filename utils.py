@@ -13,6 +13,7 @@ import os
 import re
 import base64
 import logging
+import random
 import time
 from datetime import datetime
 from typing import List, Dict, Optional, Any
@@ -23,8 +24,15 @@ from google.oauth2 import service_account
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
 from bs4 import BeautifulSoup
 
+# orjson is an optional speedup; fall back to stdlib json when absent
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -128,11 +136,50 @@ def get_gmail_service(creds=None):
     return build('gmail', 'v1', credentials=creds)
 
 
+class _OrjsonModel(JsonModel):
+    """
+    JsonModel that decodes responses with orjson.
+
+    Request bodies stay on stdlib json: its ASCII-escaped output is safe for
+    the transport, which sends str bodies as latin-1.
+    """
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+        if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+            body = body['data']
+        return body
+
+
+# Last Sheets service built and the credentials it was built for
+_sheets_service_cache = (None, None)
+
+
 def get_sheets_service(creds=None):
-    """Get authenticated Sheets service."""
+    """
+    Get authenticated Sheets service.
+
+    Repeat calls with the same credentials object return the same service,
+    so its HTTP connection stays open across calls instead of paying a new
+    TLS handshake per helper. Like any googleapiclient service it is not
+    thread-safe; threads should use their own credentials.
+    """
+    global _sheets_service_cache
     if creds is None:
         creds = get_credentials_oauth()
-    return build('sheets', 'v4', credentials=creds)
+    cached_creds, service = _sheets_service_cache
+    if cached_creds is not creds:
+        # Sheets responses can be several MB of cell values; decode them
+        # with orjson when it's installed
+        if orjson:
+            service = build('sheets', 'v4', credentials=creds, model=_OrjsonModel())
+        else:
+            service = build('sheets', 'v4', credentials=creds)
+        _sheets_service_cache = (creds, service)
+    return service
 
 
 def check_gmail_watch_status() -> Dict[str, Any]:
@@ -924,14 +971,20 @@ def read_sheet_data(sheet_id: str, range_name: str, creds=None) -> List[List[Any
     return result.get('values', [])
 
 
-def _retry_on_error(func, max_retries: int = 3, base_delay: float = 2.0):
+def _retry_on_error(func, max_retries: int = 3, base_delay: float = 2.0,
+                    rate_limits_only: bool = False):
     """
     Retry a function with exponential backoff on transient errors.
 
+    Delays get up to 50% random jitter so concurrent clients that hit a
+    rate limit together don't retry in lockstep.
+
     Args:
         func: Callable to execute
         max_retries: Maximum number of retry attempts
         base_delay: Base delay in seconds (doubles each retry)
+        rate_limits_only: Retry only 429s, for non-idempotent calls (appends)
+            where a 5xx or timeout may come after the write was applied
 
     Returns:
         Result of the function call
@@ -946,18 +999,21 @@ def _retry_on_error(func, max_retries: int = 3, base_delay: float = 2.0):
             return func()
         except HttpError as e:
             last_exception = e
-            # Retry on rate limits (429) and server errors (500, 503)
-            if e.resp.status in (429, 500, 503):
-                delay = base_delay * (2 ** attempt)
-                logger.warning(f"Sheets API error {e.resp.status} (attempt {attempt + 1}/{max_retries}), retrying in {delay}s...")
+            # Retry on rate limits (429) and server errors (5xx)
+            if e.resp.status == 429 or (
+                    not rate_limits_only and e.resp.status in (500, 502, 503, 504)):
+                delay = base_delay * (2 ** attempt) * random.uniform(1, 1.5)
+                logger.warning(f"Sheets API error {e.resp.status} (attempt {attempt + 1}/{max_retries}), retrying in {delay:.1f}s...")
                 time.sleep(delay)
             else:
                 raise  # Don't retry client errors (400, 403, 404)
         except Exception as e:
             # Network errors, timeouts, etc.
+            if rate_limits_only:
+                raise
             last_exception = e
-            delay = base_delay * (2 ** attempt)
-            logger.warning(f"Sheets API error (attempt {attempt + 1}/{max_retries}): {e}, retrying in {delay}s...")
+            delay = base_delay * (2 ** attempt) * random.uniform(1, 1.5)
+            logger.warning(f"Sheets API error (attempt {attempt + 1}/{max_retries}): {e}, retrying in {delay:.1f}s...")
             time.sleep(delay)
 
     logger.error(f"All {max_retries} retries failed")